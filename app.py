@@ -1,11 +1,31 @@
 import streamlit as st
 import os
 import sys
+import threading
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 st.set_page_config(page_title="Starwalk Dining", page_icon="🌟", layout="wide")
 
+# Load the knowledge base and models in the background while the guest logs in
+from config.config import Config
+
+@st.cache_resource
+def start_warm_up():
+    # cache_resource makes this run once per process, not once per rerun
+    def run():
+        try:
+            from chat_logic import get_chat_logic
+            get_chat_logic().warm_up()
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+
+    threading.Thread(target=run, name="chat-logic-warm-up", daemon=True).start()
+    return True
+
+if Config.WARM_UP_ON_START:
+    start_warm_up()
+
 # Load CSS
 with open('assets/style.css') as f:
     st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
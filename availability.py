@@ -0,0 +1,141 @@
+import datetime
+import threading
+
+
+def _minutes(value):
+    """'19:30', '19:30:00' or a datetime.time -> minutes after midnight."""
+    if isinstance(value, datetime.time):
+        return value.hour * 60 + value.minute
+    hours, minutes = str(value).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def _clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+class AvailabilityIndex:
+    """
+    Seats booked per day and time slot, built once from reservations and
+    updated as bookings are made, so availability questions never scan the
+    database. A reservation holds its seats for `dining_minutes` from its
+    start; a slot is free for a party if every slot it would overlap has
+    room for it.
+    """
+
+    def __init__(self, seats=40, opening="17:00", closing="23:00", slot_minutes=30, dining_minutes=120):
+        self.seats = seats
+        self.opening = _minutes(opening)
+        self.closing = _minutes(closing)
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = (self.closing - self.opening) // slot_minutes
+        self.slots_held = max(1, -(-dining_minutes // slot_minutes))  # ceil
+        self.loaded_at = None
+        self._days = {}  # ISO date -> [seats used per slot]
+        self._lock = threading.Lock()
+
+    def slot_of(self, time_value):
+        """Slot number for a start time, or None outside opening hours / off the slot grid."""
+        offset = _minutes(time_value) - self.opening
+        if offset < 0 or offset % self.slot_minutes or offset // self.slot_minutes >= self.slots_per_day:
+            return None
+        return offset // self.slot_minutes
+
+    def load(self, reservations):
+        """Rebuild from rows with reservation_date, reservation_time and party_size."""
+        days = {}
+        for row in reservations:
+            if row.get("status") == "cancelled":
+                continue
+            try:
+                self._hold(days, row["reservation_date"], row["reservation_time"], int(row["party_size"]))
+            except (KeyError, TypeError, ValueError):
+                continue  # rows from before dates/times were normalised
+        with self._lock:
+            self._days = days
+            self.loaded_at = datetime.datetime.now()
+
+    def _hold(self, days, date, time_value, party_size, sign=1):
+        start = max(0, (_minutes(time_value) - self.opening) // self.slot_minutes)
+        if start >= self.slots_per_day:
+            return
+        used = days.setdefault(str(date), [0] * self.slots_per_day)
+        for slot in range(start, min(start + self.slots_held, self.slots_per_day)):
+            used[slot] += sign * party_size
+
+    def add(self, date, time_value, party_size):
+        with self._lock:
+            self._hold(self._days, date, time_value, int(party_size))
+
+    def release(self, date, time_value, party_size):
+        with self._lock:
+            self._hold(self._days, date, time_value, int(party_size), sign=-1)
+
+    def _fits(self, used, slot, party_size):
+        end = min(slot + self.slots_held, self.slots_per_day)
+        return all(used[s] + party_size <= self.seats for s in range(slot, end))
+
+    def _passed(self, date, slot, now):
+        return str(date) == now.date().isoformat() and self.opening + slot * self.slot_minutes <= now.hour * 60 + now.minute
+
+    def check(self, date, time_value, party_size, now=None):
+        """
+        None if the party can start at that time, otherwise why not:
+        "too_large", "closed" (outside booking hours), "off_grid" (not a slot
+        start, e.g. 19:15), "passed" (earlier today) or "full".
+        """
+        if party_size > self.seats:
+            return "too_large"
+        offset = _minutes(time_value) - self.opening
+        if offset < 0 or offset >= self.slots_per_day * self.slot_minutes:
+            return "closed"
+        if offset % self.slot_minutes:
+            return "off_grid"
+        slot = offset // self.slot_minutes
+        if self._passed(date, slot, now or datetime.datetime.now()):
+            return "passed"
+        with self._lock:
+            used = self._days.get(str(date))
+            if used is None or self._fits(used, slot, party_size):
+                return None
+        return "full"
+
+    def is_available(self, date, time_value, party_size):
+        return self.check(date, time_value, party_size) is None
+
+    def last_start(self):
+        """Latest bookable start time, 'HH:MM:SS'."""
+        return _clock(self.opening + (self.slots_per_day - 1) * self.slot_minutes)
+
+    def suggest(self, date, time_value, party_size, limit=3, days_ahead=7, now=None):
+        """
+        Nearest open (date, time) starts: same day first, by distance from the
+        requested time, then the same time window on the following days.
+        Start times that have already passed today are never offered.
+        """
+        if party_size > self.seats:
+            return []
+        now = now or datetime.datetime.now()
+        wanted = min(max(_minutes(time_value) - self.opening, 0), (self.slots_per_day - 1) * self.slot_minutes)
+        wanted_slot = wanted // self.slot_minutes
+        by_distance = sorted(range(self.slots_per_day), key=lambda s: (abs(s - wanted_slot), s))
+        day = datetime.date.fromisoformat(str(date))
+        suggestions = []
+        with self._lock:
+            for offset in range(days_ahead + 1):
+                current = day + datetime.timedelta(days=offset)
+                used = self._days.get(current.isoformat())
+                for slot in by_distance:
+                    if self._passed(current, slot, now):
+                        continue
+                    if used is None or self._fits(used, slot, party_size):
+                        suggestions.append((current.isoformat(), _clock(self.opening + slot * self.slot_minutes)))
+                        if len(suggestions) >= limit:
+                            return suggestions
+                        if offset:
+                            break  # one option per later day
+        return suggestions
+
+    def stats(self):
+        with self._lock:
+            return {"days": len(self._days), "loaded_at": self.loaded_at}
@@ -0,0 +1,102 @@
+"""
+Booking state footprint and serialization benchmark.
+
+Holds N in-progress booking flows in memory and reports bytes per session
+(tracemalloc) for the slots-based BookingFlow against the old dict-based
+layout, then the encoded size and serialize/deserialize cost of the binary
+format against JSON.
+
+    python benchmarks/bench_booking_state.py --sessions 50000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from booking_flow import BookingFlow, BookingState
+
+SAMPLE_BOOKING = {
+    "name": "Jane Doe",
+    "email": "jane.doe@example.com",
+    "phone": "+1 555 123 4567",
+    "date": "2026-05-20",
+    "time": "19:00:00",
+}
+
+
+class DictFlow:
+    """The previous layout: instance __dict__, free-form dict, missing_fields list."""
+
+    def __init__(self):
+        self.state = BookingState.INITIAL
+        self.booking_data = {}
+        self.missing_fields = ["name", "email", "phone", "date", "time", "party_size"]
+
+
+def make_flow(cls, i):
+    flow = cls()
+    flow.state = BookingState.COLLECT_PARTY_SIZE
+    for key, value in SAMPLE_BOOKING.items():
+        # Distinct strings per session, as real input would be
+        flow.booking_data[key] = f"{value}{i}" if key == "name" else value + ""
+    return flow
+
+
+def bytes_per_session(cls, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    flows = [make_flow(cls, i) for i in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del flows
+    return (after - before) / n
+
+
+def time_per_op(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "sessions": args.sessions,
+        "dict_bytes_per_session": bytes_per_session(DictFlow, args.sessions),
+        "slots_bytes_per_session": bytes_per_session(BookingFlow, args.sessions),
+    }
+
+    flows = [make_flow(BookingFlow, i) for i in range(args.sessions)]
+    encoded = [flow.to_bytes() for flow in flows]
+    encoded_json = [json.dumps(flow.to_dict()) for flow in flows]
+    assert BookingFlow.from_bytes(encoded[0]).to_dict() == flows[0].to_dict()
+    results.update({
+        "binary_bytes": sum(map(len, encoded)) / len(encoded),
+        "json_bytes": sum(map(len, encoded_json)) / len(encoded_json),
+        "binary_serialize_us": time_per_op(BookingFlow.to_bytes, flows),
+        "binary_deserialize_us": time_per_op(BookingFlow.from_bytes, encoded),
+        "json_serialize_us": time_per_op(lambda f: json.dumps(f.to_dict()), flows),
+        "json_deserialize_us": time_per_op(lambda s: BookingFlow.from_dict(json.loads(s)), encoded_json),
+    })
+
+    print(f"{args.sessions} in-progress sessions")
+    print(f"in memory:  dict layout {results['dict_bytes_per_session']:.0f} B/session, "
+          f"slots layout {results['slots_bytes_per_session']:.0f} B/session")
+    print(f"encoded:    binary {results['binary_bytes']:.0f} B, json {results['json_bytes']:.0f} B")
+    print(f"binary:     serialize {results['binary_serialize_us']:.2f} us, deserialize {results['binary_deserialize_us']:.2f} us")
+    print(f"json:       serialize {results['json_serialize_us']:.2f} us, deserialize {results['json_deserialize_us']:.2f} us")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Load test for chat turns: concurrent virtual users drive
+ChatLogic.process_message through scripted multi-turn conversations
+(knowledge questions, menu questions, full bookings, abandoned bookings and
+chit-chat). Everything ChatLogic talks to is a deterministic local stand-in
+with adjustable latency:
+
+  - LLM: StubChatModel (fixed time to first token plus time per token)
+  - Supabase: MockPostgREST, over real HTTP (benchmarks/mock_postgrest.py)
+  - SMTP: the aiosmtpd sink from benchmarks/bench_smtp.py
+  - Embeddings: HashEmbeddings, against the committed faiss_index
+
+Reports throughput, turn latency percentiles (overall, per conversation kind
+and per traced stage) and memory growth. Results are written as JSON named
+after the current commit, so runs can be compared across commits.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_chat_load.py --users 8 --conversations 200 --llm-latency-ms 300
+    python benchmarks/bench_chat_load.py --compare benchmarks/results/chat_load-<older commit>.json
+"""
+import argparse
+import asyncio
+import datetime
+import functools
+import gc
+import hashlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from benchmarks.bench_smtp import start_local_server
+from benchmarks.mock_postgrest import MockPostgREST
+from config.config import Config
+from utils.context_assembler import count_tokens
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+QUESTIONS = [
+    "What are your opening hours?",
+    "Where are you located?",
+    "Is there a dress code?",
+    "What is your cancellation policy?",
+    "Do you cater for allergies?",
+    "Can I bring my own wine?",
+    "Do you have parking nearby?",
+    "Tell me about Stellar Fusion cuisine.",
+]
+MENU_QUESTIONS = [
+    "How much is the Supernova Steak?",
+    "What's the cheapest dessert?",
+    "What appetizers do you have?",
+    "How much is the Cosmic Risotto?",
+]
+CHITCHAT = ["Hi there!", "How are you today?", "Thanks, that's all.", "You've been very helpful."]
+TIMES = ["17:00", "17:30", "18:00", "18:30", "19:00", "19:30", "20:00", "20:30", "21:00"]
+
+
+# --- Stand-ins ---
+
+class HashEmbeddings(Embeddings):
+    """Deterministic unit vectors derived from the text; same text, same vector."""
+
+    def __init__(self, dim=384, latency_ms=0.0):
+        self.dim = dim
+        self.latency = latency_ms / 1000
+
+    @property
+    def model(self):
+        # RAGPipeline.warm_up touches .model to load it
+        return self
+
+    def _embed(self, text):
+        rng = np.random.default_rng(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:16], 16))
+        vector = rng.normal(size=self.dim)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self._embed(text)
+
+
+class StubChatModel:
+    """
+    Answers the prompts ChatLogic sends (intent, slot extraction, RAG, chit-chat)
+    with fixed replies, after latency_ms plus ms_per_token per reply token.
+    """
+
+    def __init__(self, latency_ms=300.0, ms_per_token=0.0):
+        self.latency = latency_ms / 1000
+        self.per_token = ms_per_token / 1000
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _reply(self, messages):
+        prompt = str(messages[-1].content)
+        if "determine intent" in prompt:
+            text = prompt.split('Input: "', 1)[-1].split('"\n', 1)[0].lower()
+            if any(word in text for word in ("book", "table", "reserv")):
+                return "BOOKING"
+            return "QUERY" if "?" in text else "OTHER"
+        if "Extract reservation details" in prompt:
+            return "{}"
+        if "User Question:" in prompt:
+            question = prompt.split("User Question:", 1)[1].strip()
+            return (f"Thanks for asking. Based on our information, here is what I can tell you about "
+                    f"\"{question}\": please see the details above, and I can also help you book a table.")
+        return "Happy to help! Ask me about our menu and opening hours, or say you'd like to book a table."
+
+    def _usage(self, messages, reply):
+        prompt_tokens = sum(count_tokens(str(m.content)) for m in messages)
+        completion_tokens = count_tokens(reply)
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def _count_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def _delay(self, reply):
+        return self.latency + self.per_token * count_tokens(reply)
+
+    def invoke(self, messages):
+        reply = self._reply(messages)
+        self._count_call()
+        time.sleep(self._delay(reply))
+        return AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+
+    async def ainvoke(self, messages):
+        reply = self._reply(messages)
+        self._count_call()
+        await asyncio.sleep(self._delay(reply))
+        return AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+
+    def stream(self, messages):
+        reply = self._reply(messages)
+        self._count_call()
+        time.sleep(self.latency)
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.per_token)
+            yield AIMessageChunk(content=word if i == len(words) - 1 else word + " ")
+
+
+# --- Conversations ---
+
+def booking_turns(n, today):
+    date = today + datetime.timedelta(days=1 + n % 90)
+    time_value = TIMES[(n // 90) % len(TIMES)]
+    return [
+        f"I'd like to book a table for 2 on {date.isoformat()} at {time_value}",
+        f"Guest Number{n}",
+        f"guest{n}@example.com",
+        f"+1 555 {n % 1000:03d} {n % 10000:04d}",
+        "No special requests",
+        "yes",
+    ]
+
+
+def build_conversation(kind, n, rng, today):
+    if kind == "question":
+        return rng.sample(QUESTIONS, 3)
+    if kind == "menu":
+        return rng.sample(MENU_QUESTIONS, 2)
+    if kind == "booking":
+        return booking_turns(n, today)
+    if kind == "abandoned":
+        # Starts a booking and walks away; the flow stays in the session store
+        return booking_turns(n, today)[:rng.randint(1, 3)]
+    return rng.sample(CHITCHAT, 2)
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        mix[kind.strip()] = float(weight or 1)
+    unknown = set(mix) - {"question", "menu", "booking", "abandoned", "chitchat"}
+    if unknown:
+        raise ValueError(f"Unknown conversation kinds: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def plan(count, mix, seed, offset=0):
+    """Same seed -> same conversations in the same order."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=count)
+    return [(offset + n, kind, build_conversation(kind, offset + n, rng, today)) for n, kind in enumerate(kinds)]
+
+
+def run_conversation(logic, conversation, prefix):
+    n, kind, turns = conversation
+    session_id = f"{prefix}-{n}"
+    history, latencies = [], []
+    reply = ""
+    for text in turns:
+        start = time.perf_counter()
+        reply = logic.process_message(session_id, text, history)
+        latencies.append((time.perf_counter() - start) * 1000)
+        history += [HumanMessage(content=text), AIMessage(content=reply)]
+    return {"kind": kind, "latencies": latencies, "booked": "Booking ID" in reply}
+
+
+def run_conversations(logic, conversations, users, prefix):
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        return list(pool.map(functools.partial(run_conversation, logic, prefix=prefix), conversations))
+
+
+# --- Measurement ---
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    pick = lambda q: ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": round(pick(0.5), 2),
+        "p95_ms": round(pick(0.95), 2),
+        "p99_ms": round(pick(0.99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # Peak rather than current outside Linux (ru_maxrss is bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, previous_path):
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nvs {previous.get('commit')} ({os.path.basename(previous_path)}):")
+    rows = [
+        ("turns/sec", "turns_per_sec", None),
+        ("turn p50 ms", "latency", "p50_ms"),
+        ("turn p95 ms", "latency", "p95_ms"),
+        ("turn p99 ms", "latency", "p99_ms"),
+        ("RSS growth MB", "memory", "rss_growth_mb"),
+    ]
+    for label, key, sub in rows:
+        old, new = previous.get(key), current.get(key)
+        if sub:
+            old, new = (old or {}).get(sub), (new or {}).get(sub)
+        if old is None or new is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"  {label:<14} {old:>10.2f} -> {new:>10.2f}  ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent conversations")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured conversations run first")
+    parser.add_argument("--mix", default="question=4,menu=2,booking=2,abandoned=1,chitchat=1",
+                        help="relative weights of the conversation kinds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-ms-per-token", type=float, default=0.0)
+    parser.add_argument("--db-latency-ms", type=float, default=40.0)
+    parser.add_argument("--smtp-latency-ms", type=float, default=100.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--smtp-port", type=int, default=8026)
+    parser.add_argument("--tracemalloc", action="store_true", help="also track Python allocations (slower)")
+    parser.add_argument("--json", help="results file (default benchmarks/results/chat_load-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    # Stand-in services, wired in before anything connects
+    db_server = MockPostgREST(latency_ms=args.db_latency_ms).start()
+    Config.SUPABASE_URL, Config.SUPABASE_KEY = db_server.url, "mock-key"
+    smtp_server, smtp_sink = start_local_server(args.smtp_port, args.smtp_latency_ms)
+    os.environ["EMAIL_SENDER"] = "bookings@starwalk.test"
+
+    from chat_logic import ChatLogic
+    from rag_pipeline import RAGPipeline
+    from utils.email_outbox import EmailOutbox
+    from utils.email_sender import SMTPConnectionPool, plain_transport, send_confirmation_emails
+    from utils.tracing import get_tracer
+
+    smtp_pool = SMTPConnectionPool(plain_transport("127.0.0.1", args.smtp_port))
+    llm = StubChatModel(args.llm_latency_ms, args.llm_ms_per_token)
+    logic = ChatLogic(
+        llm=llm,
+        rag=RAGPipeline(embeddings=HashEmbeddings(latency_ms=args.embed_latency_ms)),
+        email_outbox=EmailOutbox(send_batch=functools.partial(send_confirmation_emails, pool=smtp_pool)),
+    )
+    logic.warm_up()
+
+    try:
+        run_conversations(logic, plan(args.warmup, mix, args.seed + 1, offset=100000), args.users, "warmup")
+        tracer = get_tracer()
+        tracer.reset()
+        conversations = plan(args.conversations, mix, args.seed)
+
+        gc.collect()
+        if args.tracemalloc:
+            tracemalloc.start()
+        rss_before = rss_mb()
+        llm_calls_before, db_requests_before = llm.calls, db_server.requests
+        start = time.perf_counter()
+        results = run_conversations(logic, conversations, args.users, "load")
+        seconds = time.perf_counter() - start
+        gc.collect()
+        rss_after = rss_mb()
+        memory = {"rss_before_mb": round(rss_before, 1), "rss_after_mb": round(rss_after, 1),
+                  "rss_growth_mb": round(rss_after - rss_before, 2)}
+        if args.tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            memory.update(traced_current_mb=round(current / 2 ** 20, 2), traced_peak_mb=round(peak / 2 ** 20, 2))
+
+        booked = sum(1 for r in results if r["booked"])
+        # Confirmation emails go out after the reply; give the outbox time to finish
+        deadline = time.time() + 30
+        while smtp_sink.received < booked and time.time() < deadline:
+            time.sleep(0.1)
+    finally:
+        smtp_pool.close()
+        smtp_server.stop()
+        db_server.stop()
+
+    all_latencies = [ms for r in results for ms in r["latencies"]]
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "params": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+        "conversations": len(results),
+        "turns": len(all_latencies),
+        "seconds": round(seconds, 2),
+        "turns_per_sec": round(len(all_latencies) / seconds, 2),
+        "conversations_per_sec": round(len(results) / seconds, 2),
+        "latency": percentiles(all_latencies),
+        "by_kind": {
+            kind: percentiles([ms for r in results if r["kind"] == kind for ms in r["latencies"]])
+            for kind in mix if any(r["kind"] == kind for r in results)
+        },
+        "bookings": {
+            "attempted": sum(1 for r in results if r["kind"] == "booking"),
+            "confirmed": booked,
+            "emails_delivered": smtp_sink.received,
+        },
+        "requests": {"llm": llm.calls - llm_calls_before, "supabase": db_server.requests - db_requests_before},
+        "sessions": logic.sessions.stats(),
+        "memory": memory,
+        "stages": {
+            name: {key: round(value, 2) if isinstance(value, float) else value for key, value in stats.items()}
+            for name, stats in sorted(tracer.stage_stats().items())
+        },
+    }
+
+    print(f"{report['conversations']} conversations, {report['turns']} turns in {report['seconds']:.1f}s "
+          f"with {args.users} users -> {report['turns_per_sec']:.1f} turns/s")
+    latency = report["latency"]
+    print(f"turn latency: p50 {latency['p50_ms']:.0f} ms, p95 {latency['p95_ms']:.0f} ms, "
+          f"p99 {latency['p99_ms']:.0f} ms, max {latency['max_ms']:.0f} ms")
+    for kind, stats in report["by_kind"].items():
+        print(f"  {kind:<10} {stats['count']:>5} turns  p50 {stats['p50_ms']:>7.1f}  p95 {stats['p95_ms']:>7.1f}  p99 {stats['p99_ms']:>7.1f} ms")
+    print("stages:")
+    for name, stats in report["stages"].items():
+        print(f"  {name:<24} {stats['count']:>5}  p50 {stats['p50_ms']:>7.1f}  p95 {stats['p95_ms']:>7.1f}  p99 {stats['p99_ms']:>7.1f} ms")
+    bookings = report["bookings"]
+    print(f"bookings: {bookings['confirmed']}/{bookings['attempted']} confirmed, {bookings['emails_delivered']} emails delivered; "
+          f"{report['requests']['llm']} LLM calls, {report['requests']['supabase']} Supabase requests")
+    print(f"memory: RSS {memory['rss_before_mb']:.1f} -> {memory['rss_after_mb']:.1f} MB "
+          f"({memory['rss_growth_mb']:+.2f} MB); {report['sessions']['entries']} sessions held")
+
+    path = args.json or os.path.join(RESULTS_DIR, f"chat_load-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {path}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Cold-start benchmark for the RAG pipeline.
+
+Each run starts a fresh Python process and measures: importing rag_pipeline,
+constructing RAGPipeline (index load), and the first query (embedding + FAISS
+search). With a warm embedding cache the first query never loads the model.
+
+    python benchmarks/bench_cold_start.py --runs 5 --query "What are your opening hours?"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from rag_pipeline import RAGPipeline
+t1 = time.perf_counter()
+rag = RAGPipeline()
+t2 = time.perf_counter()
+rag.query({query!r})
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "init_ms": (t2 - t1) * 1000,
+    "index_load_ms": rag.startup_timings.get("index_load_ms", 0.0),
+    "first_query_ms": (t3 - t2) * 1000,
+    "total_ms": (t3 - t0) * 1000,
+}}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--query", default="What are your opening hours?")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    code = CHILD.format(root=ROOT, query=args.query)
+    runs = []
+    for i in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        print(f"run {i + 1}: " + ", ".join(f"{k} {v:.0f}" for k, v in runs[-1].items()))
+
+    summary = {key: statistics.median(r[key] for r in runs) for key in runs[0]}
+    print("median: " + ", ".join(f"{k} {v:.0f}" for k, v in summary.items()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "median": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Booking creation latency: create_booking database function vs. the separate
+customers upsert + reservations insert, against the mock PostgREST server
+with a fixed per-request latency. Also checks that retrying with the same
+idempotency key creates only one reservation, and that a project without the
+function falls back to the separate requests.
+
+    python benchmarks/bench_create_booking.py --bookings 50 --latency-ms 40
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.mock_postgrest import MockPostgREST
+from config.config import Config
+
+
+def sample_booking(i):
+    return {
+        "name": f"Guest {i}",
+        "email": f"guest{i % 20}@example.com",
+        "phone": "+1 555 123 4567",
+        "date": "2026-05-20",
+        "time": "19:00:00",
+        "party_size": "4",
+        "special_requests": "",
+    }
+
+
+def run(db_module, server, bookings, use_rpc):
+    Config.BOOKING_RPC = use_rpc
+    db_module._rpc_available = None
+    manager = db_module.SupabaseManager()
+    start_requests = server.requests
+    latencies = []
+    for i in range(bookings):
+        booking = sample_booking(i)
+        key = db_module.booking_idempotency_key(f"bench-{use_rpc}-{i}", booking)
+        t0 = time.perf_counter()
+        result = manager.create_booking(booking, idempotency_key=key)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if not result["success"]:
+            sys.exit(f"create_booking failed: {result['error']}")
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "requests_per_booking": round((server.requests - start_requests) / bookings, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    server = MockPostgREST(latency_ms=args.latency_ms).start()
+    Config.SUPABASE_URL, Config.SUPABASE_KEY = server.url, "mock-key"
+    import db.supabase_client as db_module
+
+    results = {"bookings": args.bookings, "latency_ms": args.latency_ms}
+    results["rpc"] = run(db_module, server, args.bookings, use_rpc=True)
+    results["separate_requests"] = run(db_module, server, args.bookings, use_rpc=False)
+
+    # Retrying the same booking (e.g. a rerun during confirmation) must not double-book
+    Config.BOOKING_RPC = True
+    manager = db_module.SupabaseManager()
+    booking = sample_booking(0)
+    key = db_module.booking_idempotency_key("retry-session", booking)
+    before = len(server.reservations)
+    first = manager.create_booking(booking, idempotency_key=key)
+    second = manager.create_booking(booking, idempotency_key=key)
+    results["retry_safe"] = (
+        len(server.reservations) == before + 1
+        and first["data"][0]["id"] == second["data"][0]["id"]
+        and first["created"] and not second["created"]
+    )
+
+    # Without the migration: one failed RPC, then the separate requests
+    server.rpc = False
+    db_module._rpc_available = None
+    fallback = manager.create_booking(sample_booking(1), idempotency_key="fallback")
+    results["fallback_ok"] = fallback["success"] and db_module._rpc_available is False
+    server.stop()
+
+    for name in ("rpc", "separate_requests"):
+        r = results[name]
+        print(f"{name:<18} p50 {r['p50_ms']:>7.1f} ms  p95 {r['p95_ms']:>7.1f} ms  "
+              f"{r['requests_per_booking']:.1f} requests/booking")
+    print(f"retry with same key creates one reservation: {results['retry_safe']}")
+    print(f"falls back when the function is missing: {results['fallback_ok']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
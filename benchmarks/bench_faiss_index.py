@@ -0,0 +1,119 @@
+"""
+Compare FAISS index types for the knowledge base.
+
+For each index type (flat, ivf, hnsw, pq) reports build time, recall@k against
+exact flat search, p50/p99 single-query latency and serialized index size.
+Vectors come from the saved knowledge base index, or from a synthetic
+clustered corpus when --synthetic N is given (useful before there is enough
+real data to train IVF/PQ).
+
+    python benchmarks/bench_faiss_index.py --synthetic 50000 --queries 500 --k 3
+    python benchmarks/bench_faiss_index.py --nlist 256 --nprobe 16 --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config.config import Config
+from utils.faiss_index import INDEX_TYPES, build_index, index_memory_bytes, reconstruct_all
+
+
+def load_vectors(args, rng):
+    if args.synthetic:
+        # Clustered data resembles real embeddings better than uniform noise
+        centers = rng.normal(size=(max(args.synthetic // 200, 8), args.dim)).astype(np.float32)
+        labels = rng.integers(0, len(centers), size=args.synthetic)
+        vectors = centers[labels] + 0.3 * rng.normal(size=(args.synthetic, args.dim)).astype(np.float32)
+        return vectors.astype(np.float32)
+    path = os.path.join(args.index_path, "index.faiss")
+    if not os.path.exists(path):
+        sys.exit(f"No index at {path}; ingest a document first or pass --synthetic N")
+    return reconstruct_all(faiss.read_index(path)).astype(np.float32)
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--synthetic", type=int, default=0, help="generate N synthetic vectors instead of loading the index")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--index-path", default="faiss_index")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nlist", type=int, default=Config.FAISS_IVF_NLIST)
+    parser.add_argument("--nprobe", type=int, default=Config.FAISS_IVF_NPROBE)
+    parser.add_argument("--hnsw-m", type=int, default=Config.FAISS_HNSW_M)
+    parser.add_argument("--ef-search", type=int, default=Config.FAISS_HNSW_EF_SEARCH)
+    parser.add_argument("--pq-m", type=int, default=Config.FAISS_PQ_M)
+    parser.add_argument("--pq-nbits", type=int, default=Config.FAISS_PQ_NBITS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = load_vectors(args, rng)
+    # Queries: perturbed copies of stored vectors
+    picks = rng.integers(0, len(vectors), size=args.queries)
+    queries = vectors[picks] + 0.05 * rng.normal(size=(args.queries, vectors.shape[1])).astype(np.float32)
+
+    params = dict(Config.faiss_params())
+    params.update({
+        "nlist": args.nlist, "nprobe": args.nprobe, "hnsw_m": args.hnsw_m,
+        "hnsw_ef_search": args.ef_search, "pq_m": args.pq_m, "pq_nbits": args.pq_nbits,
+    })
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, k={args.k}")
+    results = []
+    ground_truth = None
+    for index_type in args.types.split(","):
+        start = time.perf_counter()
+        try:
+            index = build_index(index_type, vectors, params)
+        except Exception as e:
+            print(f"{index_type:<6} skipped: {e}")
+            continue
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        found = []
+        for q in queries:
+            t0 = time.perf_counter()
+            _, ids = index.search(q.reshape(1, -1), args.k)
+            latencies.append(time.perf_counter() - t0)
+            found.append(ids[0])
+        found = np.array(found)
+        if ground_truth is None:
+            # Exact neighbours from a flat index, whatever order types were given in
+            ground_truth = found if index_type == "flat" else build_index("flat", vectors, params).search(queries, args.k)[1]
+        recall = np.mean([len(set(f) & set(g)) / args.k for f, g in zip(found, ground_truth)])
+
+        row = {
+            "type": index_type,
+            "build_s": round(build_s, 3),
+            f"recall@{args.k}": round(float(recall), 4),
+            "p50_ms": round(percentile_ms(latencies, 50), 3),
+            "p99_ms": round(percentile_ms(latencies, 99), 3),
+            "memory_mb": round(index_memory_bytes(index) / 1e6, 2),
+        }
+        results.append(row)
+        print(
+            f"{index_type:<6} build {row['build_s']:>7.2f}s  recall@{args.k} {row[f'recall@{args.k}']:.3f}  "
+            f"p50 {row['p50_ms']:.3f}ms  p99 {row['p99_ms']:.3f}ms  memory {row['memory_mb']:.2f}MB"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"vectors": len(vectors), "dim": int(vectors.shape[1]), "params": params, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
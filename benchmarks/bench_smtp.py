@@ -0,0 +1,97 @@
+"""
+SMTP throughput benchmark: pooled connections vs. one connection per message.
+
+Runs against a local aiosmtpd stand-in server, so no real mail is sent.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/bench_smtp.py --messages 200 --pool-size 2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.email_sender import SMTPConnectionPool, build_confirmation_email, plain_transport
+
+SAMPLE_BOOKING = {
+    "name": "Jane Doe",
+    "date": "2026-05-20",
+    "time": "19:00:00",
+    "party_size": "4",
+    "special_requests": "Window seat",
+}
+
+
+class _SinkHandler:
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+
+def start_local_server(port, latency_ms=0.0):
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        sys.exit("aiosmtpd is required for this benchmark: pip install -r benchmarks/requirements.txt")
+    handler = _SinkHandler(latency_ms)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    return controller, handler
+
+
+def run(label, send, messages, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(send, messages))
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for r in results if r["success"])
+    print(f"{label:<22} {ok}/{len(messages)} sent in {elapsed:.2f}s -> {len(messages) / elapsed:.1f} msg/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8025)
+    args = parser.parse_args()
+
+    controller, handler = start_local_server(args.port)
+    try:
+        transport = plain_transport("127.0.0.1", args.port)
+        messages = [
+            build_confirmation_email("bench@starwalk.test", f"guest{i}@starwalk.test", SAMPLE_BOOKING)
+            for i in range(args.messages)
+        ]
+
+        def send_unpooled(msg):
+            # What send_confirmation_email used to do: connect, send, quit
+            try:
+                server = transport()
+                server.send_message(msg)
+                server.quit()
+                return {"success": True}
+            except Exception as e:
+                return {"success": False, "error": str(e)}
+
+        pool = SMTPConnectionPool(transport, size=args.pool_size)
+
+        run("connection per message", send_unpooled, messages, args.threads)
+        run(f"pooled (size={args.pool_size})", pool.send, messages, args.threads)
+        print(f"pool opened {pool.connections_opened} connection(s); server received {handler.received} message(s)")
+        pool.close()
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
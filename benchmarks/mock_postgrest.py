@@ -0,0 +1,166 @@
+"""
+In-memory stand-in for the parts of Supabase's REST API (PostgREST) that
+SupabaseManager uses for bookings: the customers and reservations tables and
+the create_booking function from db/migrations. Reservation reads support
+the simple column filters (eq, neq, gt, gte, lt, lte) and limit. Each
+request sleeps for --latency-ms first to model the network round trip to
+the real project.
+
+    python benchmarks/mock_postgrest.py --port 54321 --latency-ms 40
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=test streamlit run app.py
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import threading
+import operator
+import time
+from urllib.parse import parse_qs, urlparse
+
+# PostgREST filter operators, compared as strings (ISO dates/times sort correctly)
+FILTERS = {"eq": operator.eq, "neq": operator.ne, "gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+class MockPostgREST:
+    def __init__(self, port=0, latency_ms=0.0, rpc=True):
+        self.latency = latency_ms / 1000
+        self.rpc = rpc
+        self.requests = 0
+        self.customers = {}  # email -> row
+        self.reservations = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Table operations ---
+
+    def upsert_customer(self, row):
+        with self._lock:
+            existing = self.customers.get(row["email"])
+            if existing:
+                existing.update(row)
+                return existing
+            row = dict(row, id=next(self._ids))
+            self.customers[row["email"]] = row
+            return row
+
+    def insert_reservation(self, row):
+        with self._lock:
+            key = row.get("idempotency_key")
+            if key:
+                for existing in self.reservations:
+                    if existing.get("idempotency_key") == key:
+                        return existing, False
+            row = dict(row, id=next(self._ids), created_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+            self.reservations.append(row)
+            return row, True
+
+    def select_reservations(self, query):
+        with self._lock:
+            rows = list(self.reservations)
+        for column, values in query.items():
+            for value in values:
+                op, _, operand = value.partition(".")
+                if op in FILTERS:
+                    rows = [r for r in rows if r.get(column) is not None and FILTERS[op](str(r[column]), operand)]
+        if "limit" in query:
+            rows = rows[:int(query["limit"][0])]
+        return rows
+
+    def create_booking(self, params):
+        customer = self.upsert_customer({"name": params["p_name"], "email": params["p_email"], "phone": params["p_phone"]})
+        reservation, created = self.insert_reservation({
+            "customer_id": customer["id"],
+            "party_size": params["p_party_size"],
+            "reservation_date": params["p_date"],
+            "reservation_time": params["p_time"],
+            "special_requests": params.get("p_special_requests") or "",
+            "status": "confirmed",
+            "idempotency_key": params.get("p_idempotency_key"),
+        })
+        return {"id": reservation["id"], "created": created}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _begin(self):
+                with mock._lock:
+                    mock.requests += 1
+                time.sleep(mock.latency)
+                parsed = urlparse(self.path)
+                return parsed.path, parse_qs(parsed.query)
+
+            def do_GET(self):
+                path, query = self._begin()
+                if path == "/rest/v1/customers":
+                    email = query.get("email", [""])[0].removeprefix("eq.")
+                    row = mock.customers.get(email)
+                    return self._reply(200, [row] if row else [])
+                if path == "/rest/v1/reservations":
+                    return self._reply(200, mock.select_reservations(query))
+                self._reply(404, {"message": f"Unknown path {path}"})
+
+            def do_POST(self):
+                path, _ = self._begin()
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if path == "/rest/v1/customers":
+                    return self._reply(201, [mock.upsert_customer(body)])
+                if path == "/rest/v1/reservations":
+                    row, _ = mock.insert_reservation(body)
+                    return self._reply(201, [row])
+                if path == "/rest/v1/rpc/create_booking" and mock.rpc:
+                    return self._reply(200, mock.create_booking(body))
+                self._reply(404, {
+                    "code": "PGRST202",
+                    "message": f"Could not find the function {path.rsplit('/', 1)[-1]} in the schema cache",
+                    "details": None,
+                    "hint": None,
+                })
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--no-rpc", action="store_true", help="behave as if the migration hasn't been run")
+    args = parser.parse_args()
+    server = MockPostgREST(args.port, args.latency_ms, rpc=not args.no_rpc).start()
+    print(f"Mock PostgREST on {server.url} ({args.latency_ms:.0f} ms per request). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
+from collections.abc import MutableMapping
+import datetime
 from enum import Enum
 import re
+import struct
+
+from slot_extractor import CHANGE_RE, NUMBER_WORDS, extract_slots, is_not_name, normalize_date, normalize_time
 
 class BookingState(Enum):
     INITIAL = "initial"
@@ -13,123 +18,330 @@ class BookingState(Enum):
     CONFIRMATION = "confirmation"
     COMPLETED = "completed"
 
+# Wire codes for states; append only, never reorder (serialized flows use them)
+STATE_CODES = (
+    BookingState.INITIAL, BookingState.COLLECT_NAME, BookingState.COLLECT_EMAIL,
+    BookingState.COLLECT_PHONE, BookingState.COLLECT_DATE, BookingState.COLLECT_TIME,
+    BookingState.COLLECT_PARTY_SIZE, BookingState.COLLECT_REQUESTS,
+    BookingState.CONFIRMATION, BookingState.COMPLETED,
+)
+REQUIRED_FIELDS = ("name", "email", "phone", "date", "time", "party_size")
+FIELD_STATES = {
+    "name": BookingState.COLLECT_NAME,
+    "email": BookingState.COLLECT_EMAIL,
+    "phone": BookingState.COLLECT_PHONE,
+    "date": BookingState.COLLECT_DATE,
+    "time": BookingState.COLLECT_TIME,
+    "party_size": BookingState.COLLECT_PARTY_SIZE,
+}
+FIELD_PROMPTS = {
+    "name": "Please provide your **Name** for the reservation.",
+    "email": "What is your **Email** address?",
+    "phone": "What is your **Phone Number**?",
+    "date": "What **Date** would you like to book for? (e.g., Tomorrow, 2024-05-20)",
+    "time": "What **Time** would you like?",
+    "party_size": "How many people are in your **Party**?",
+}
+FIELD_LABELS = {"party_size": "party of", "date": "date", "time": "time"}
+
+# Binary format: version, state code, then each field as a uint16 length
+# (0xFFFF = unset) followed by UTF-8 bytes
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BB")
+_LENGTH = struct.Struct("<H")
+_UNSET = 0xFFFF
+
+class BookingData(MutableMapping):
+    """
+    Fixed-field booking details. Behaves like the dict it replaces
+    (booking_data["name"], .get(), "email" in ...) without a per-session dict.
+    """
+    __slots__ = ("name", "email", "phone", "date", "time", "party_size", "special_requests")
+
+    def __init__(self, **fields):
+        for field in self.__slots__:
+            setattr(self, field, None)
+        for key, value in fields.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        self[key]  # KeyError if unset
+        setattr(self, key, None)
+
+    def __iter__(self):
+        return (field for field in self.__slots__ if getattr(self, field) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"BookingData({dict(self)!r})"
+
 class BookingFlow:
+    __slots__ = ("state", "booking_data")
+
     def __init__(self):
         self.state = BookingState.INITIAL
-        self.booking_data = {}
-        self.missing_fields = [
-            "name", "email", "phone", "date", "time", "party_size"
-        ]
+        self.booking_data = BookingData()
+
+    @property
+    def missing_fields(self):
+        return [field for field in REQUIRED_FIELDS if field not in self.booking_data]
+
+    def to_dict(self):
+        """Plain-data form (JSON-friendly)."""
+        return {"state": self.state.value, "booking_data": dict(self.booking_data)}
+
+    @classmethod
+    def from_dict(cls, data):
+        flow = cls()
+        flow.state = BookingState(data["state"])
+        flow.booking_data = BookingData(**data["booking_data"])
+        return flow
+
+    def to_bytes(self):
+        """Compact versioned binary form for checkpointing to a session store."""
+        parts = [_HEADER.pack(FORMAT_VERSION, STATE_CODES.index(self.state))]
+        for field in BookingData.__slots__:
+            value = getattr(self.booking_data, field)
+            if value is None:
+                parts.append(_LENGTH.pack(_UNSET))
+            else:
+                raw = str(value).encode("utf-8")[:_UNSET - 1]
+                parts.append(_LENGTH.pack(len(raw)))
+                parts.append(raw)
+        return b"".join(parts)
 
-    def process_input(self, user_input, llm_response=None):
+    @classmethod
+    def from_bytes(cls, data):
+        version, state_code = _HEADER.unpack_from(data, 0)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported booking state version {version}")
+        flow = cls()
+        flow.state = STATE_CODES[state_code]
+        offset = _HEADER.size
+        for field in BookingData.__slots__:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            if length != _UNSET:
+                setattr(flow.booking_data, field, data[offset:offset + length].decode("utf-8"))
+                offset += length
+        return flow
+
+    def is_idle(self):
+        return self.state == BookingState.INITIAL and not self.booking_data
+
+    def _validate_field(self, field, user_input):
         """
-        Process user input based on current state.
-        Returns: (next_response_to_user, is_booking_complete)
+        Check a direct answer to the question we asked.
+        Returns (value, None) or (None, error_message).
         """
-        # Basic state machine
-        if self.state == BookingState.INITIAL:
-            self.state = BookingState.COLLECT_NAME
-            return "Please provide your **Name** for the reservation.", False
-        
-        elif self.state == BookingState.COLLECT_NAME:
-            self.booking_data["name"] = user_input
-            self.state = BookingState.COLLECT_EMAIL
-            return f"Thanks {user_input}. What is your **Email** address?", False
-
-        elif self.state == BookingState.COLLECT_EMAIL:
+        raw = user_input.strip()
+        if field == "name":
+            if is_not_name(raw):
+                return None, "Please provide your **Name** for the reservation."
+            return raw, None
+
+        elif field == "email":
             # Robust Regex Validation
             email_pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
-            if not re.match(email_pattern, user_input.strip()):
-                return "That doesn't look like a valid email address. Please try again (e.g., user@example.com).", False
-            
-            self.booking_data["email"] = user_input.strip()
-            self.state = BookingState.COLLECT_PHONE
-            return "Got it. What is your **Phone Number**?", False
-
-        elif self.state == BookingState.COLLECT_PHONE:
+            if not re.match(email_pattern, raw):
+                return None, "That doesn't look like a valid email address. Please try again (e.g., user@example.com)."
+            return raw, None
+
+        elif field == "phone":
             # Validate Phone: Allow spaces/dashes/parens, but require at least 7 digits
-            digits_only = re.sub(r"\D", "", user_input)
+            digits_only = re.sub(r"\D", "", raw)
             if len(digits_only) < 7:
-                return "That phone number seems too short. Please enter a valid number (at least 7 digits).", False
-            
-            self.booking_data["phone"] = user_input.strip()
-            self.state = BookingState.COLLECT_DATE
-            return "Thanks. What **Date** would you like to book for? (e.g., Tomorrow, 2024-05-20)", False
-
-        elif self.state == BookingState.COLLECT_DATE:
-            raw_date = user_input.lower().strip()
-            
-            # Simple heuristic validation
+                return None, "That phone number seems too short. Please enter a valid number (at least 7 digits)."
+            return raw, None
+
+        elif field == "date":
+            raw_date = raw.lower()
             # Reject inputs that look like Times (contain am/pm and length < 8)
             if ("am" in raw_date or "pm" in raw_date) and len(raw_date) < 10:
-                 return "That looks like a time! Please enter a **Date** (e.g., Tomorrow, Monday, or 2024-05-20).", False
-            
+                return None, "That looks like a time! Please enter a **Date** (e.g., Tomorrow, Monday, or 2024-05-20)."
             # Reject very short inputs unless 'may'
             if len(raw_date) < 3:
-                 return "Please enter a valid date (e.g., Tomorrow, Next Friday, 2024-05-20).", False
-                 
-            self.booking_data["date"] = user_input # In a real app, we would parse this to YYYY-MM-DD here
-            self.state = BookingState.COLLECT_TIME
-            return "What **Time** would you like?", False
-
-        elif self.state == BookingState.COLLECT_TIME:
-            # Simple normalization for "12pm" -> "12:00:00"
-            raw_time = user_input.lower().strip()
-            formatted_time = raw_time
-            
-            # Very basic heuristic for xpm/xam
-            if "pm" in raw_time or "am" in raw_time:
-                 try:
-                     import datetime
-                     # Parse 12pm, 5:30pm etc.
-                     # Remove spaces
-                     raw_time = raw_time.replace(" ", "")
-                     # pad minutes if missing e.g. "5pm" -> "5:00pm"
-                     if ":" not in raw_time:
-                         raw_time = raw_time.replace("am", ":00am").replace("pm", ":00pm")
-                     
-                     dt = datetime.datetime.strptime(raw_time, "%I:%M%p")
-                     formatted_time = dt.strftime("%H:%M:%S")
-                 except:
-                     pass # Fallback to raw input if parse fails
-            
-            self.booking_data["time"] = formatted_time
-            self.state = BookingState.COLLECT_PARTY_SIZE
-            return f"Got it ({formatted_time}). How many people are in your **Party**?", False
-
-        elif self.state == BookingState.COLLECT_PARTY_SIZE:
-            # simple validation
-            if not any(char.isdigit() for char in user_input):
-                 return "Please enter a number for the party size.", False
-            
-            self.booking_data["party_size"] = user_input
+                return None, "Please enter a valid date (e.g., Tomorrow, Next Friday, 2024-05-20)."
+            # Stored as YYYY-MM-DD, which is what reservations.reservation_date expects
+            date = normalize_date(raw_date)
+            if date is None:
+                return None, "Sorry, I couldn't work out that date. Please enter it like Tomorrow, Next Friday or 2024-05-20."
+            if date < datetime.date.today():
+                return None, f"{date:%A %d %B %Y} has already passed. What **Date** would you like to book for?"
+            return date.isoformat(), None
+
+        elif field == "time":
+            # "12pm" -> "12:00:00"; "7" and "7:30" mean evening: we only serve dinner
+            formatted_time = normalize_time(raw, assume_pm=True)
+            if formatted_time is None:
+                bare = re.fullmatch(r"(\d{1,2})", raw)
+                if bare and 1 <= int(bare.group(1)) <= 23:
+                    hour = int(bare.group(1))
+                    hour = hour + 12 if hour < 12 else hour
+                    formatted_time = f"{hour:02d}:00:00"
+            if formatted_time is None:
+                return None, "Please enter a time like 7pm or 19:30."
+            return formatted_time, None
+
+        elif field == "party_size":
+            digits = re.search(r"\d+", raw)
+            size = int(digits.group(0)) if digits else (NUMBER_WORDS.get(raw.lower().split()[0]) if raw else None)
+            if size is None:
+                return None, "Please enter a number for the party size."
+            if size < 1:
+                return None, "The party size needs to be at least 1. How many guests?"
+            return str(size), None
+
+        return raw, None
+
+    def _summary(self):
+        return (
+            f"Please confirm your booking details:\n\n"
+            f"- **Name**: {self.booking_data['name']}\n"
+            f"- **Email**: {self.booking_data['email']}\n"
+            f"- **Phone**: {self.booking_data['phone']}\n"
+            f"- **Date**: {self.booking_data['date']}\n"
+            f"- **Time**: {self.booking_data['time']}\n"
+            f"- **Party Size**: {self.booking_data['party_size']}\n"
+            f"- **Requests**: {self.booking_data.get('special_requests', 'None')}\n\n"
+            f"Type **'Yes'** to confirm or **'No'** to restart."
+        )
+
+    def _check_availability(self, check_availability):
+        """
+        If date, time and party size are all known and the slot is full, clear
+        the time and offer the nearest open slots instead. Returns the reply or None.
+        """
+        if not check_availability or any(f not in self.booking_data for f in ("date", "time", "party_size")):
+            return None
+        date, time, party_size = self.booking_data["date"], self.booking_data["time"], int(self.booking_data["party_size"])
+        reason, suggestions = check_availability(date, time, party_size)
+        if reason is None:
+            return None
+        del self.booking_data["time"]
+        self.state = BookingState.COLLECT_TIME
+        if not suggestions:
+            return (f"Sorry, we can't take a party of {party_size} online around then. "
+                    "Please try another date or call us. What **Time** would you like?")
+        options = ", ".join(
+            time_text[:5] if option_date == date else f"{option_date} {time_text[:5]}"
+            for option_date, time_text in suggestions
+        )
+        problem = {
+            "closed": f"we don't take bookings at {time[:5]}; that's outside our booking hours",
+            "off_grid": f"{time[:5]} isn't one of our booking times",
+            "passed": f"{time[:5]} today has already passed",
+        }.get(reason, f"{time[:5]} on {date} is fully booked for {party_size}")
+        return f"Sorry, {problem}. The nearest open times are: {options}. What **Time** would you like?"
+
+    def _fill_slots(self, user_input, llm_extract=None, check_availability=None):
+        """
+        Fill every field found in the message, then ask for the next missing one.
+        A message that matches nothing is taken as the answer to the question asked.
+        """
+        asked = next((field for field, state in FIELD_STATES.items() if state == self.state), None)
+        # A guessed name never replaces one already given
+        slots = extract_slots(user_input, bare_name=asked == "name", guess_name="name" not in self.booking_data)
+        # Details given earlier are only replaced when this message answers that
+        # question, names the guest explicitly, or says it is a correction
+        correcting = CHANGE_RE.search(user_input) is not None
+        slots = {
+            field: value for field, value in slots.items()
+            if field not in self.booking_data or field in (asked, "name") or correcting
+        }
+        error = None
+        for field in ("date", "party_size"):
+            if field in slots:
+                slots[field], field_error = self._validate_field(field, str(slots[field]))
+                if field_error and not error:
+                    # Ask that question next, so the reply is read as its answer
+                    error, self.state = field_error, FIELD_STATES[field]
+        if asked and not slots:
+            value, asked_error = self._validate_field(asked, user_input)
+            error = error or asked_error
+            if value is not None:
+                slots[asked] = value
+
+        # Only what the patterns missed goes to the (optional) LLM extractor
+        leftovers = [field for field in REQUIRED_FIELDS if field not in slots and field not in self.booking_data]
+        if llm_extract and leftovers and not error and len(user_input.split()) >= 6:
+            for field, raw in llm_extract(user_input, leftovers).items():
+                if field in leftovers and raw:
+                    value, _ = self._validate_field(field, str(raw))
+                    if value is not None:
+                        slots[field] = value
+
+        for field, value in slots.items():
+            if value is not None:
+                self.booking_data[field] = value
+        if error:
+            return error
+
+        unavailable = self._check_availability(check_availability)
+        if unavailable:
+            return unavailable
+
+        ack = []
+        if "name" in slots:
+            ack.append(f"Thanks {slots['name']}.")
+        noted = [f"{FIELD_LABELS[f]} {slots[f]}" for f in ("party_size", "date", "time") if f in slots]
+        if len(noted) > 1 or (noted and len(slots) > 1):
+            ack.append("Got it: " + ", ".join(noted) + ".")
+        elif "time" in slots and asked == "time":
+            ack.append(f"Got it ({slots['time']}).")
+        elif slots and "name" not in slots:
+            ack.append("Got it.")
+
+        missing = self.missing_fields
+        if missing:
+            self.state = FIELD_STATES[missing[0]]
+            return " ".join(ack + [FIELD_PROMPTS[missing[0]]])
+        if "special_requests" not in self.booking_data:
             self.state = BookingState.COLLECT_REQUESTS
-            return "Any **Special Requests** (e.g., dietary restrictions, high chair)? Say 'None' if none.", False
+            return " ".join(ack + ["Any **Special Requests** (e.g., dietary restrictions, high chair)? Say 'None' if none."])
+        self.state = BookingState.CONFIRMATION
+        return self._summary()
 
-        elif self.state == BookingState.COLLECT_REQUESTS:
+    def process_input(self, user_input, llm_extract=None, check_availability=None):
+        """
+        Process user input based on current state.
+        `llm_extract(text, fields)` optionally recovers fields the patterns missed;
+        `check_availability(date, time, party_size)` returns (reason, suggestions),
+        where reason is None when the slot can be booked.
+        Returns: (next_response_to_user, is_booking_complete)
+        """
+        if self.state == BookingState.COLLECT_REQUESTS:
             self.booking_data["special_requests"] = user_input
             self.state = BookingState.CONFIRMATION
-            
-            summary = (
-                f"Please confirm your booking details:\n\n"
-                f"- **Name**: {self.booking_data['name']}\n"
-                f"- **Email**: {self.booking_data['email']}\n"
-                f"- **Phone**: {self.booking_data['phone']}\n"
-                f"- **Date**: {self.booking_data['date']}\n"
-                f"- **Time**: {self.booking_data['time']}\n"
-                f"- **Party Size**: {self.booking_data['party_size']}\n"
-                f"- **Requests**: {self.booking_data['special_requests']}\n\n"
-                f"Type **'Yes'** to confirm or **'No'** to restart."
-            )
-            return summary, False
+            return self._summary(), False
 
         elif self.state == BookingState.CONFIRMATION:
             if "yes" in user_input.lower():
+                # The slot may have filled up since we last checked
+                unavailable = self._check_availability(check_availability)
+                if unavailable:
+                    return unavailable, False
                 self.state = BookingState.COMPLETED
-                return "Great! Your booking is confirmed. I've sent you a confirmation email.", True
+                return "Great! Your booking is confirmed. A confirmation email will follow shortly.", True
             else:
                 self.state = BookingState.INITIAL
-                self.booking_data = {}
+                self.booking_data = BookingData()
                 return "Booking cancelled. How else can I help you?", False
 
+        elif self.state == BookingState.INITIAL or self.state in FIELD_STATES.values():
+            return self._fill_slots(user_input, llm_extract, check_availability), False
+
         return "Error in booking flow.", False
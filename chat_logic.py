@@ -1,44 +1,137 @@
+import asyncio
+import base64
+import datetime
+import json
 import sys
 import os
+import threading
+import time
+from collections import Counter
 from langchain_openai import AzureChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config.config import Config
-from rag_pipeline import RAGPipeline
+from rag_pipeline import get_rag_pipeline
+from availability import AvailabilityIndex
 from booking_flow import BookingFlow, BookingState
-from db.supabase_client import SupabaseManager
-from utils.email_sender import send_confirmation_email
+from intent_classifier import IntentClassifier
+from db.supabase_client import SupabaseManager, booking_idempotency_key
+from utils.email_outbox import EmailOutbox
+from utils.semantic_cache import SemanticCache
+from utils.session_store import create_session_store
+from utils.context_assembler import count_tokens
+from utils.tracing import annotate, get_tracer
+
+
+def _record_usage(span, messages, reply, usage=None):
+    """Token counts as reported by the API, or estimated when it doesn't report them."""
+    if usage:
+        span.set("prompt_tokens", usage.get("input_tokens"))
+        span.set("completion_tokens", usage.get("output_tokens"))
+    else:
+        span.set("prompt_tokens", sum(count_tokens(str(m.content)) for m in messages))
+        span.set("completion_tokens", count_tokens(reply))
+        span.set("tokens_estimated", True)
 
 class ChatLogic:
-    def __init__(self):
-        self.llm = AzureChatOpenAI(
+    def __init__(self, llm=None, rag=None, email_outbox=None):
+        """
+        The defaults talk to the configured services; llm, rag and
+        email_outbox can be swapped for local stand-ins (see benchmarks/bench_chat_load.py).
+        """
+        self._created_at = time.perf_counter()
+        self.llm = llm or AzureChatOpenAI(
             azure_deployment=Config.AZURE_DEPLOYMENT_NAME,
             openai_api_version=Config.AZURE_OPENAI_API_VERSION,
             azure_endpoint=Config.AZURE_OPENAI_ENDPOINT,
             api_key=Config.AZURE_OPENAI_API_KEY,
             temperature=Config.TEMPERATURE
         )
-        self.rag = RAGPipeline()
-        self.booking_flows = {} # Map session_id -> BookingFlow
+        self.rag = rag or get_rag_pipeline()
+        # Per-session state (booking flow, latest email job), bounded and expiring
+        self.sessions = create_session_store(
+            Config.SESSION_BACKEND,
+            ttl=Config.SESSION_TTL_SECONDS,
+            max_entries=Config.SESSION_MAX_ENTRIES,
+            path=Config.SESSION_DB_PATH
+        )
         self.supabase = SupabaseManager()
+        # Seats per time slot, loaded from reservations on first use
+        self.availability = AvailabilityIndex(
+            seats=Config.RESTAURANT_SEATS,
+            opening=Config.OPENING_TIME,
+            closing=Config.CLOSING_TIME,
+            slot_minutes=Config.SLOT_MINUTES,
+            dining_minutes=Config.DINING_MINUTES
+        )
+        self._availability_lock = threading.Lock()
+        self.intent_classifier = IntentClassifier(
+            self.rag.embed_query,
+            llm_classify=self._llm_intent,
+            min_similarity=Config.INTENT_MIN_SIMILARITY,
+            min_margin=Config.INTENT_MIN_MARGIN
+        )
+        self.answer_cache = SemanticCache(
+            threshold=Config.ANSWER_CACHE_THRESHOLD,
+            ttl=Config.ANSWER_CACHE_TTL,
+            max_entries=Config.ANSWER_CACHE_MAX_ENTRIES
+        )
+        # Cached answers are only valid for the knowledge base they came from
+        self.rag.add_index_listener(self.answer_cache.clear)
+        # Confirmation emails go out on a background worker
+        self.email_outbox = email_outbox or EmailOutbox()
+        # Running totals of prompt context size before/after assembly
+        self.context_stats = Counter()
+        # Per-stage spans for every turn (see utils/tracing.py)
+        self.tracer = get_tracer()
+        self.startup_timings = {"init_ms": (time.perf_counter() - self._created_at) * 1000}
+
+    def warm_up(self):
+        """Load models and embed the intent examples ahead of the first message."""
+        with self.tracer.span("chat.warm_up") as span:
+            self.rag.warm_up()
+            self.intent_classifier.warm_up()
+            self.startup_timings["warm_up_ms"] = span.duration_ms
+
+    def get_startup_timings(self):
+        timings = dict(self.rag.startup_timings)
+        timings.update(self.startup_timings)
+        return timings
+
+    def _record_first_answer(self):
+        # Called during a turn, so the cold-start figure lands on that trace
+        if "first_answer_ms" not in self.startup_timings:
+            self.startup_timings["first_answer_ms"] = (time.perf_counter() - self._created_at) * 1000
+            annotate(first_answer_ms=round(self.startup_timings["first_answer_ms"], 1))
 
     def get_booking_flow(self, session_id):
-        if session_id not in self.booking_flows:
-            self.booking_flows[session_id] = BookingFlow()
-        return self.booking_flows[session_id]
+        state = self.sessions.get(session_id) or {}
+        if "flow" in state:
+            return BookingFlow.from_bytes(base64.b64decode(state["flow"]))
+        return BookingFlow()
 
-    def detect_intent(self, user_input, history):
-        """
-        Determine if user is asking a general question or wants to book.
-        Simple Keyword / LLM based detection.
-        """
-        # Simple keyword heuristic for speed/robustness
-        booking_keywords = ["book", "reservation", "reserve", "table", "appointment"]
-        
-        # If in middle of booking, intent is booking
-        # But this is stateless, so we rely on session state checks in `process_message`
-        
-        # Check if LLM thinks it's a booking intent
+    def _save_flow(self, session_id, flow):
+        if flow.is_idle():
+            self._save_session(session_id, flow=None)
+        else:
+            self._save_session(session_id, flow=base64.b64encode(flow.to_bytes()).decode("ascii"))
+
+    def _save_session(self, session_id, **changes):
+        """Merge changes into a session's stored state; empty sessions aren't kept."""
+        state = self.sessions.get(session_id) or {}
+        state.update(changes)
+        state = {key: value for key, value in state.items() if value is not None}
+        if state:
+            self.sessions.put(session_id, state)
+        else:
+            self.sessions.delete(session_id)
+
+    def end_session(self, session_id):
+        """Forget a session, e.g. when the user clears the chat."""
+        self.sessions.delete(session_id)
+
+    def _llm_intent(self, user_input):
+        """Slow path: ask the LLM to classify the message."""
         prompt = f"""
         Analyze the user input and determine intent.
         Input: "{user_input}"
@@ -48,54 +141,171 @@ class ChatLogic:
         - "QUERY" if user is asking about menu, hours, location, policies, etc.
         - "OTHER" for chit-chat.
         """
-        response = self.llm.invoke([SystemMessage(content=prompt)])
+        messages = [SystemMessage(content=prompt)]
+        with self.tracer.span("llm.intent") as span:
+            response = self.llm.invoke(messages)
+            _record_usage(span, messages, response.content, getattr(response, "usage_metadata", None))
         intent = response.content.strip().upper()
-        
-        if any(w in user_input.lower() for w in booking_keywords):
-            return "BOOKING"
-            
-        return intent
+        for label in ("BOOKING", "QUERY", "OTHER"):
+            if label in intent:
+                return label
+        return "OTHER"
 
-    def process_message(self, session_id, user_input, chat_history):
-        flow = self.get_booking_flow(session_id)
+    def _llm_extract_slots(self, user_input, fields):
+        """Slow path for booking details the regex extractor couldn't find."""
+        prompt = f"""
+        Extract reservation details from the message below.
+        Message: "{user_input}"
+
+        Return ONLY a JSON object with these keys: {", ".join(fields)}.
+        Use null for anything the message does not state. Do not guess.
+        """
+        messages = [SystemMessage(content=prompt)]
+        with self.tracer.span("llm.extract_slots") as span:
+            response = self.llm.invoke(messages)
+            _record_usage(span, messages, response.content, getattr(response, "usage_metadata", None))
+        text = response.content.strip()
+        try:
+            data = json.loads(text[text.find("{"):text.rfind("}") + 1])
+        except ValueError:
+            return {}
+        return {field: data[field] for field in fields if data.get(field)} if isinstance(data, dict) else {}
+
+    def _slot_extractor(self):
+        return self._llm_extract_slots if Config.BOOKING_LLM_EXTRACTION else None
+
+    def _refresh_availability(self):
+        """(Re)load the availability index if it is missing or older than the refresh interval."""
+        loaded_at = self.availability.loaded_at
+        max_age = datetime.timedelta(seconds=Config.AVAILABILITY_REFRESH_SECONDS)
+        if loaded_at is not None and datetime.datetime.now() - loaded_at < max_age:
+            return
+        with self._availability_lock:
+            if self.availability.loaded_at is loaded_at:
+                with self.tracer.span("availability.load") as span:
+                    rows = self.supabase.get_upcoming_reservations(datetime.date.today().isoformat())
+                    self.availability.load(rows)
+                    span.set("reservations", len(rows))
+
+    def check_availability(self, date, time, party_size):
+        """
+        (reason, nearest open (date, time) suggestions) for a booking request;
+        reason is None when it can be booked (see AvailabilityIndex.check).
+        """
+        self._refresh_availability()
+        reason = self.availability.check(date, time, party_size)
+        if reason is None:
+            return None, []
+        return reason, self.availability.suggest(date, time, party_size)
+
+    def detect_intent(self, user_input, history):
+        """
+        Determine if user is asking a general question or wants to book.
+        Tiered: keywords, then embedding similarity, then the LLM only if
+        the local tiers are not confident. Returns an IntentDecision.
+        """
+        # If in middle of booking, intent is booking
+        # But this is stateless, so we rely on session state checks in `process_message`
+        with self.tracer.span("chat.detect_intent") as span:
+            decision = self.intent_classifier.classify(user_input)
+            span.set("intent", decision.intent)
+            span.set("tier", decision.tier)
+            span.set("confidence", decision.confidence)
+        return decision
+
+    def _complete_booking_turn(self, session_id, flow, user_input):
+        """Advance an in-progress booking flow and return the reply text."""
+        with self.tracer.span("chat.booking_turn") as span:
+            response, is_complete = flow.process_input(
+                user_input, llm_extract=self._slot_extractor(), check_availability=self.check_availability
+            )
+            span.set("state", flow.state.name if not is_complete else "COMPLETE")
         
-        # 1. If we are already in a booking flow (not INITIAL), continue it.
-        if flow.state != BookingState.INITIAL:
-            response, is_complete = flow.process_input(user_input)
-            
             if is_complete:
                 # Save to DB
-                db_result = self.supabase.create_booking(flow.booking_data)
+                # Same session + details -> same key, so a repeated confirmation can't double-book
+                idempotency_key = booking_idempotency_key(session_id, flow.booking_data)
+                db_result = self.supabase.create_booking(flow.booking_data, idempotency_key=idempotency_key)
                 if db_result["success"]:
                     response += f"\n\n(Booking ID: {db_result['data'][0]['id']})"
-                    
-                    # Send Confirmation Email 
+                    created = db_result.get("created", True)
+                    span.set("created", created)
+                    if created:
+                        self.availability.add(flow.booking_data["date"], flow.booking_data["time"], flow.booking_data["party_size"])
+                
+                    # Queue the confirmation email; the reply doesn't wait for SMTP
                     # Assuming email is in booking_data since we collected it
-                    if "email" in flow.booking_data:
-                        email_res = send_confirmation_email(flow.booking_data["email"], flow.booking_data)
-                        if email_res["success"]:
-                            response += "\n📧 Confirmation email sent."
-                        else:
-                            response += f"\n(⚠️ Email failed: {email_res.get('error')})"
+                    if created and "email" in flow.booking_data:
+                        # The outbox tracks the job per session; its ids are only valid in this process
+                        self.email_outbox.submit(flow.booking_data["email"], dict(flow.booking_data), session_id=session_id)
+                        response += "\n📧 Confirmation email is on its way."
                 else:
                     response += f"\n\n(Note: Could not save to database: {db_result.get('error')})"
-                
+            
                 # Reset flow
-                self.booking_flows[session_id] = BookingFlow() 
-                
+                flow = BookingFlow()
+
+            self._save_flow(session_id, flow)
             return response
 
+    def get_email_status(self, session_id):
+        """Status of the latest confirmation email for a session, or None."""
+        return self.email_outbox.latest_status(session_id)
+
+    def _prepare_turn(self, session_id, user_input, chat_history):
+        """
+        Route a message.
+        Returns (reply, llm_messages, cache_key): either a ready reply, or the
+        messages to send to the LLM plus the (query vector, cache generation) to
+        cache the answer under.
+        """
+        flow = self.get_booking_flow(session_id)
+        
+        # 1. If we are already in a booking flow (not INITIAL), continue it.
+        if flow.state != BookingState.INITIAL:
+            annotate(route="booking")
+            return self._complete_booking_turn(session_id, flow, user_input), None, None
+
         # 2. Detect Intent
-        intent = self.detect_intent(user_input, chat_history)
+        intent = self.detect_intent(user_input, chat_history).intent
+        annotate(intent=intent)
 
-        if "BOOKING" in intent:
+        if intent == "BOOKING":
+            annotate(route="booking")
             # Start booking flow
-            response, _ = flow.process_input(user_input) # Will trigger INITIAL -> COLLECT_NAME
-            return response
+            # Fills whatever details the opening message already contains
+            response, _ = flow.process_input(
+                user_input, llm_extract=self._slot_extractor(), check_availability=self.check_availability
+            )
+            self._save_flow(session_id, flow)
+            return response, None, None
+
+        elif intent == "QUERY":
+            # Structured menu questions (prices, cheapest, dietary) need no LLM
+            with self.tracer.span("menu.answer") as span:
+                menu_answer = self.rag.menu.answer(user_input)
+                span.set("matched", menu_answer is not None)
+            if menu_answer is not None:
+                self.context_stats["menu_answers"] += 1
+                annotate(route="menu")
+                return menu_answer, None, None
+
+            # Serve repeated questions from the semantic cache. The generation is
+            # read before retrieval so an ingest meanwhile voids the answer
+            generation = self.answer_cache.generation
+            with self.tracer.span("answer_cache.lookup") as span:
+                query_vector = self.rag.embed_query(user_input)
+                cached = self.answer_cache.get(query_vector)
+                span.set("cache_hit", cached is not None)
+            if cached is not None:
+                annotate(route="answer_cache")
+                return cached, None, None
+            annotate(route="rag")
 
-        elif "QUERY" in intent:
             # RAG
-            context = self.rag.query(user_input)
+            context, stats = self.rag.query_with_stats(user_input)
+            if stats:
+                self.context_stats.update(requests=1, tokens_in=stats["tokens_in"], tokens_saved=stats["tokens_saved"])
             
             rag_prompt = f"""
             You are a helpful restaurant assistant. Answer the user question based on the context below.
@@ -106,10 +316,90 @@ class ChatLogic:
             
             User Question: {user_input}
             """
-            response = self.llm.invoke([SystemMessage(content=rag_prompt)])
-            return response.content
+            return None, [SystemMessage(content=rag_prompt)], (query_vector, generation)
             
         else:
             # General chit chat
-            response = self.llm.invoke(chat_history + [HumanMessage(content=user_input)])
-            return response.content
+            annotate(route="chat")
+            return None, chat_history + [HumanMessage(content=user_input)], None
+
+    def process_message(self, session_id, user_input, chat_history):
+        with self.tracer.span("chat.turn", mode="sync"):
+            reply, messages, cache_key = self._prepare_turn(session_id, user_input, chat_history)
+            if reply is None:
+                with self.tracer.span("llm.completion") as span:
+                    response = self.llm.invoke(messages)
+                    reply = response.content
+                    _record_usage(span, messages, reply, getattr(response, "usage_metadata", None))
+                if cache_key is not None:
+                    self.answer_cache.put(cache_key[0], reply, cache_key[1])
+            self._record_first_answer()
+        return reply
+
+    def process_message_stream(self, session_id, user_input, chat_history):
+        """
+        Streaming variant of `process_message`.
+        Yields the reply in pieces: LLM answers token by token as they arrive,
+        booking-flow and cached replies as a single chunk.
+        """
+        with self.tracer.span("chat.turn", mode="stream"):
+            reply, messages, cache_key = self._prepare_turn(session_id, user_input, chat_history)
+            if reply is not None:
+                self._record_first_answer()
+                yield reply
+                return
+
+            parts = []
+            usage = None
+            with self.tracer.span("llm.completion", streamed=True) as span:
+                for chunk in self.llm.stream(messages):
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    if chunk.content:
+                        if not parts:
+                            self._record_first_answer()
+                            span.set("first_token_ms", round(span.duration_ms, 1))
+                        parts.append(chunk.content)
+                        yield chunk.content
+                _record_usage(span, messages, "".join(parts), usage)
+
+            if cache_key is not None and parts:
+                self.answer_cache.put(cache_key[0], "".join(parts), cache_key[1])
+
+    async def process_message_async(self, session_id, user_input, chat_history):
+        """
+        Asyncio variant of `process_message`.
+        Routing and the reservation write run in a worker thread, the LLM call
+        is awaited, and the confirmation email never blocks the reply.
+        """
+        with self.tracer.span("chat.turn", mode="async"):
+            # to_thread copies the context, so routing spans nest under this turn
+            reply, messages, cache_key = await asyncio.to_thread(
+                self._prepare_turn, session_id, user_input, chat_history
+            )
+            if reply is None:
+                with self.tracer.span("llm.completion") as span:
+                    response = await self.llm.ainvoke(messages)
+                    reply = response.content
+                    _record_usage(span, messages, reply, getattr(response, "usage_metadata", None))
+                if cache_key is not None:
+                    self.answer_cache.put(cache_key[0], reply, cache_key[1])
+            self._record_first_answer()
+        return reply
+
+
+_chat_logic = None
+_chat_logic_lock = threading.Lock()
+
+
+def get_chat_logic():
+    """
+    Process-wide ChatLogic shared by every page and session.
+    Streamlit keeps imported modules in sys.modules, so this survives reruns.
+    """
+    global _chat_logic
+    if _chat_logic is None:
+        with _chat_logic_lock:
+            if _chat_logic is None:
+                _chat_logic = ChatLogic()
+    return _chat_logic
+
@@ -19,6 +19,104 @@ class Config:
     TEMPERATURE = 0.7
     MAX_TOKENS = 1000
 
+    # Intent detection (embedding tier; below these the LLM is asked)
+    INTENT_MIN_SIMILARITY = float(os.getenv("INTENT_MIN_SIMILARITY", 0.35))
+    INTENT_MIN_MARGIN = float(os.getenv("INTENT_MIN_MARGIN", 0.05))
+
+    # Start loading models/index when the app starts instead of on the first chat message
+    WARM_UP_ON_START = os.getenv("WARM_UP_ON_START", "true").lower() == "true"
+
+    # Knowledge base ingestion
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 50000))
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 2))
+
+    # Vector index: "flat" (exact), "ivf", "hnsw" or "pq".
+    # Trained types fall back to flat until there is enough data to train them.
+    FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+    FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", 64))
+    FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", 8))
+    FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", 32))
+    FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", 80))
+    FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", 64))
+    FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", 16))
+    FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", 8))
+
+    # Ask the LLM for booking details the regex extractor misses in longer messages
+    BOOKING_LLM_EXTRACTION = os.getenv("BOOKING_LLM_EXTRACTION", "false").lower() == "true"
+
+    # Table capacity for availability checks (seats per time slot)
+    RESTAURANT_SEATS = int(os.getenv("RESTAURANT_SEATS", "40"))
+    OPENING_TIME = os.getenv("OPENING_TIME", "17:00")
+    CLOSING_TIME = os.getenv("CLOSING_TIME", "23:00")
+    SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", "30"))
+    DINING_MINUTES = int(os.getenv("DINING_MINUTES", "120"))
+    AVAILABILITY_REFRESH_SECONDS = int(os.getenv("AVAILABILITY_REFRESH_SECONDS", "300"))
+
+    # Create bookings through the create_booking database function (db/migrations)
+    BOOKING_RPC = os.getenv("BOOKING_RPC", "true").lower() == "true"
+
+    # Rows per page on the Profile page's reservation list
+    BOOKINGS_PAGE_SIZE = int(os.getenv("BOOKINGS_PAGE_SIZE", "20"))
+
+    # Rows fetched per page on the Admin reservations table
+    ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "100"))
+
+    # Minimum seconds between analytics delta fetches on the Admin page
+    ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "30"))
+
+    # Chat session state: "memory" (per process) or "sqlite" (shared file)
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+    SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+    # Menu text used for direct menu answers until a menu PDF is ingested
+    MENU_TEXT_PATH = os.getenv("MENU_TEXT_PATH", "assets/menu.txt")
+
+    # Prompt context: chunks retrieved per question and their token budget
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 3))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", MAX_TOKENS * 3 // 4))
+
+    # Retrieval: "hybrid" (vector + BM25 with reciprocal-rank fusion) or "vector"
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+    RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", 20))
+    RRF_K = int(os.getenv("RRF_K", 60))
+    # Optional cross-encoder reranker, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2" (off when empty)
+    RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+    RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 10))
+    # Latency budgets: stages over budget are logged; the reranker is skipped
+    # when it would push the whole retrieval past RETRIEVAL_BUDGET_MS
+    RETRIEVAL_BUDGET_MS = int(os.getenv("RETRIEVAL_BUDGET_MS", 250))
+    RETRIEVAL_STAGE_BUDGETS_MS = {"embed": 50, "vector": 20, "bm25": 20, "rerank": 200}
+
+    # Tracing: per-stage spans for chat turns. Export "console", "jsonl"
+    # (OTLP/JSON lines in TRACE_FILE), both ("console,jsonl") or "none";
+    # percentiles for the Admin page are kept either way
+    TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+    TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+    TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", 1000))
+
+    # Semantic answer cache for knowledge base questions
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.92))
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 3600))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 512))
+
+    @classmethod
+    def faiss_params(cls):
+        """Parameters for the FAISS index types, as used by utils.faiss_index"""
+        return {
+            "nlist": cls.FAISS_IVF_NLIST,
+            "nprobe": cls.FAISS_IVF_NPROBE,
+            "hnsw_m": cls.FAISS_HNSW_M,
+            "hnsw_ef_construction": cls.FAISS_HNSW_EF_CONSTRUCTION,
+            "hnsw_ef_search": cls.FAISS_HNSW_EF_SEARCH,
+            "pq_m": cls.FAISS_PQ_M,
+            "pq_nbits": cls.FAISS_PQ_NBITS,
+        }
+
     @classmethod
     def validate(cls):
         """Validate that all required environment variables are set"""
@@ -0,0 +1,171 @@
+from collections import Counter
+import threading
+import time
+
+import pandas as pd
+
+# Delta fetches start from here on the first load
+EPOCH = "1970-01-01T00:00:00"
+
+
+class ReservationAnalytics:
+    """
+    Running aggregates over reservations: covers per date and per time slot,
+    party-size histogram, bookings per customer and status counts.
+    Built once by paging through reservations, then kept current from the
+    rows created since the last refresh, so dashboard queries only read the
+    small aggregate tables (cached until the next change).
+    """
+
+    def __init__(self, page_size=1000):
+        self.page_size = page_size
+        self.version = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.watermark = EPOCH  # newest created_at applied
+        self.refreshed_at = None
+        self._rows = {}  # reservation id -> (date, time, party_size, customer, status)
+        self.covers_by_date = Counter()
+        self.covers_by_slot = Counter()  # (date, "HH:MM") -> covers
+        self.party_sizes = Counter()
+        self.bookings_by_customer = Counter()
+        self.statuses = Counter()
+        self._cache = {}  # (version, name, args) -> result
+        self.version += 1
+
+    def _apply(self, key, sign):
+        date, time_value, party_size, customer, status = key
+        if status != "cancelled":
+            self.covers_by_date[date] += sign * party_size
+            self.covers_by_slot[(date, time_value)] += sign * party_size
+            self.party_sizes[party_size] += sign
+            self.bookings_by_customer[customer] += sign
+        self.statuses[status] += sign
+
+    def add_rows(self, rows):
+        """Merge reservation rows (new or changed) into the aggregates."""
+        with self._lock:
+            changed = False
+            for row in rows:
+                try:
+                    key = (
+                        str(row["reservation_date"]),
+                        str(row["reservation_time"])[:5],
+                        int(row["party_size"]),
+                        (row.get("customers") or {}).get("email") or row.get("customer_id"),
+                        row.get("status") or "confirmed",
+                    )
+                except (KeyError, TypeError, ValueError):
+                    continue
+                old = self._rows.get(row["id"])
+                if old == key:
+                    continue
+                if old:
+                    self._apply(old, -1)
+                self._apply(key, 1)
+                self._rows[row["id"]] = key
+                changed = True
+            created = [row["created_at"] for row in rows if row.get("created_at")]
+            if created:
+                self.watermark = max([self.watermark] + created)
+            if changed:
+                # Cached query results belong to the previous version
+                self.version += 1
+                self._cache.clear()
+
+    def refresh(self, db, min_interval=0):
+        """Pull reservations created since the last refresh. Returns how many were applied."""
+        if self.refreshed_at and time.time() - self.refreshed_at < min_interval:
+            return 0
+        total = 0
+        while True:
+            rows = db.get_reservations(created_after=self.watermark, limit=self.page_size)
+            before = self.watermark
+            if rows:
+                self.add_rows(rows)
+            total += len(rows)
+            if len(rows) < self.page_size or self.watermark == before:
+                break
+        self.refreshed_at = time.time()
+        return total
+
+    def rebuild(self, db):
+        """Start over from all reservations (picks up status edits the delta can't see)."""
+        with self._lock:
+            self._reset()
+        return self.refresh(db)
+
+    def _cached(self, name, args, compute):
+        key = (self.version, name, args)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            result = compute()
+            self._cache[key] = result
+            return result
+
+    @staticmethod
+    def _in_window(date, from_date, to_date):
+        return (from_date is None or date >= from_date) and (to_date is None or date <= to_date)
+
+    def summary(self, from_date=None, to_date=None):
+        """Headline numbers for the window (ISO date strings, inclusive)."""
+        def compute():
+            covers = sum(c for d, c in self.covers_by_date.items() if self._in_window(d, from_date, to_date))
+            keys = [k for k in self._rows.values() if self._in_window(k[0], from_date, to_date)]
+            active = [k for k in keys if k[4] != "cancelled"]
+            seated = sum(1 for k in keys if k[4] in ("completed", "no_show"))
+            no_shows = sum(1 for k in keys if k[4] == "no_show")
+            return {
+                "bookings": len(active),
+                "covers": covers,
+                "avg_party_size": covers / len(active) if active else 0.0,
+                "cancelled": len(keys) - len(active),
+                "no_show_rate": no_shows / seated if seated else None,
+            }
+        return self._cached("summary", (from_date, to_date), compute)
+
+    def covers_per_night(self, from_date=None, to_date=None):
+        def compute():
+            data = {d: c for d, c in self.covers_by_date.items() if c and self._in_window(d, from_date, to_date)}
+            series = pd.Series(data, name="Covers", dtype="int64").sort_index()
+            series.index = pd.to_datetime(series.index)
+            return series
+        return self._cached("covers_per_night", (from_date, to_date), compute)
+
+    def peak_hours(self, from_date=None, to_date=None):
+        """Total covers per start time across the window."""
+        def compute():
+            totals = Counter()
+            for (d, slot), c in self.covers_by_slot.items():
+                if self._in_window(d, from_date, to_date):
+                    totals[slot] += c
+            return pd.Series({k: v for k, v in totals.items() if v}, name="Covers", dtype="int64").sort_index()
+        return self._cached("peak_hours", (from_date, to_date), compute)
+
+    def party_size_histogram(self):
+        def compute():
+            return pd.Series({k: v for k, v in self.party_sizes.items() if v}, name="Bookings", dtype="int64").sort_index()
+        return self._cached("party_size_histogram", (), compute)
+
+    def top_customers(self, n=10):
+        def compute():
+            top = [(c, b) for c, b in self.bookings_by_customer.most_common() if b][:n]
+            return pd.DataFrame(top, columns=["Customer", "Bookings"])
+        return self._cached("top_customers", (n,), compute)
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_reservation_analytics():
+    """One shared set of aggregates per process, like get_chat_logic()."""
+    global _analytics
+    if _analytics is None:
+        with _analytics_lock:
+            if _analytics is None:
+                _analytics = ReservationAnalytics()
+    return _analytics
@@ -0,0 +1,288 @@
+"""
+Bulk reservation import/export.
+
+Import streams CSV or Parquet rows, validates each one, and writes them in
+chunks (one customers upsert plus one reservations insert per chunk). Export
+pages through reservations server-side and streams them out. Both report
+rows/sec. Also usable from the command line:
+
+    python db/bulk.py import bookings.csv --chunk-size 500
+    python db/bulk.py export season.parquet --from 2026-01-01 --to 2026-03-31
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from slot_extractor import normalize_date, normalize_time
+
+# Same columns both ways, so an export can be re-imported: rows carrying an
+# id that is already a reservation are skipped
+COLUMNS = ["name", "email", "phone", "date", "time", "party_size", "special_requests", "status"]
+EXPORT_COLUMNS = COLUMNS + ["id", "created_at"]
+REQUIRED = ["name", "email", "date", "time", "party_size"]
+STATUSES = {"confirmed", "cancelled", "completed", "no_show"}
+EMAIL_RE = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+# normalize_date moves yearless and relative dates ("12 March", "friday") to
+# their next occurrence, which is wrong for history, so imports need the year
+FULL_DATE_RE = re.compile(r"\b\d{4}\b|\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b")
+
+
+def _format_of(name, fmt=None):
+    fmt = fmt or os.path.splitext(name)[1].lstrip(".").lower()
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported format '{fmt}' (use csv or parquet)")
+    return fmt
+
+
+def read_rows(source, fmt):
+    """Yield dict rows from a path or binary file object, without loading it all."""
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet support needs pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=1000):
+            yield from batch.to_pylist()
+        return
+    handle = open(source, "rb") if isinstance(source, str) else source
+    try:
+        yield from csv.DictReader(io.TextIOWrapper(handle, encoding="utf-8-sig", newline=""))
+    finally:
+        if isinstance(source, str):
+            handle.close()
+
+
+def validate_row(row):
+    """Returns (clean_row, None) or (None, error message)."""
+    row = {key.strip().lower(): ("" if value is None else str(value).strip()) for key, value in row.items() if key}
+    missing = [field for field in REQUIRED if not row.get(field)]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    if not EMAIL_RE.match(row["email"]):
+        return None, f"invalid email '{row['email']}'"
+    date = normalize_date(row["date"]) if FULL_DATE_RE.search(row["date"]) else None
+    if date is None:
+        return None, f"invalid date '{row['date']}' (use a full date such as 2026-03-12)"
+    time_value = normalize_time(row["time"])
+    if time_value is None:
+        return None, f"invalid time '{row['time']}'"
+    try:
+        value = float(row["party_size"])
+        if not value.is_integer():  # "2.5", "nan", "inf"
+            raise ValueError
+        party_size = int(value)
+    except (ValueError, OverflowError):
+        return None, f"invalid party_size '{row['party_size']}'"
+    if party_size < 1:
+        return None, "party_size must be at least 1"
+    status = (row.get("status") or "confirmed").lower()
+    if status not in STATUSES:
+        return None, f"invalid status '{status}'"
+    clean = {
+        "name": row["name"],
+        "email": row["email"],
+        "phone": row.get("phone", ""),
+        "date": date.isoformat(),
+        "time": time_value,
+        "party_size": party_size,
+        "special_requests": row.get("special_requests", ""),
+        "status": status,
+    }
+    if row.get("id"):
+        clean["id"] = row["id"]
+    return clean, None
+
+
+def _row_key(row):
+    # An exported reservation keeps its identity; otherwise the same row
+    # imported twice -> same key, so re-running an import is safe
+    if row.get("id"):
+        return f"export-{row['id']}"
+    return "import-" + hashlib.sha256(json.dumps(row, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+def _write_chunk(db, chunk):
+    """Returns how many reservations were actually inserted."""
+    ids = [row["id"] for _, row in chunk if row.get("id")]
+    if ids:
+        existing = db.existing_reservation_ids(ids)
+        chunk = [(line, row) for line, row in chunk if str(row.get("id", "")) not in existing]
+        if not chunk:
+            return 0
+    customers = {}
+    for _, row in chunk:
+        customers[row["email"]] = {"name": row["name"], "email": row["email"], "phone": row["phone"]}
+    customer_ids = {c["email"]: c["id"] for c in db.upsert_customers(list(customers.values()))}
+    inserted = db.insert_reservations([
+        {
+            "customer_id": customer_ids[row["email"]],
+            "party_size": row["party_size"],
+            "reservation_date": row["date"],
+            "reservation_time": row["time"],
+            "special_requests": row["special_requests"],
+            "status": row["status"],
+            "idempotency_key": _row_key(row),
+        }
+        for _, row in chunk
+    ])
+    return len(inserted or [])
+
+
+def import_bookings(db, source, fmt="csv", chunk_size=500, dry_run=False, progress_callback=None):
+    """
+    Validate and write reservations in chunks.
+    Returns {"rows", "imported", "duplicates", "errors": [(line, message)], "seconds", "rows_per_sec"};
+    "duplicates" are valid rows skipped because an earlier import already wrote them.
+    A dry run counts every valid row as imported.
+    """
+    start = time.perf_counter()
+    report = {"rows": 0, "imported": 0, "duplicates": 0, "errors": []}
+    chunk = []
+
+    def flush():
+        if not chunk:
+            return
+        written = len(chunk)
+        if not dry_run:
+            try:
+                written = _write_chunk(db, chunk)
+            except Exception as e:
+                report["errors"].extend((line, f"write failed: {e}") for line, _ in chunk)
+                chunk.clear()
+                return
+        report["imported"] += written
+        report["duplicates"] += len(chunk) - written
+        chunk.clear()
+        if progress_callback:
+            progress_callback(report["rows"], report["imported"])
+
+    # Line 1 is the CSV header
+    for line, raw in enumerate(read_rows(source, fmt), start=2):
+        report["rows"] += 1
+        row, error = validate_row(raw)
+        if error:
+            report["errors"].append((line, error))
+            continue
+        chunk.append((line, row))
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+
+    report["seconds"] = time.perf_counter() - start
+    report["rows_per_sec"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+    return report
+
+
+def iter_export_rows(db, from_date=None, to_date=None, status=None, page_size=1000):
+    """Yield flat export rows page by page (keyset pagination on the server)."""
+    after = None
+    while True:
+        page = db.get_reservations(from_date=from_date, to_date=to_date, status=status, after=after, limit=page_size)
+        for r in page:
+            customer = r.get("customers") or {}
+            yield {
+                "name": customer.get("name", ""),
+                "email": customer.get("email", ""),
+                "phone": customer.get("phone", ""),
+                "date": r.get("reservation_date"),
+                "time": r.get("reservation_time"),
+                "party_size": r.get("party_size"),
+                "special_requests": r.get("special_requests") or "",
+                "status": r.get("status"),
+                "id": r.get("id"),
+                "created_at": r.get("created_at"),
+            }
+        if len(page) < page_size:
+            return
+        after = (page[-1]["reservation_date"], page[-1]["id"])
+
+
+def export_bookings(db, out, fmt="csv", from_date=None, to_date=None, status=None, page_size=1000):
+    """
+    Write reservations to a path or binary file object.
+    Returns {"rows", "seconds", "rows_per_sec"}.
+    """
+    start = time.perf_counter()
+    rows = iter_export_rows(db, from_date, to_date, status, page_size)
+    count = 0
+    handle = open(out, "wb") if isinstance(out, str) else out
+    try:
+        if fmt == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Parquet support needs pyarrow: pip install pyarrow")
+            schema = pa.schema([(c, pa.int64() if c == "party_size" else pa.string()) for c in EXPORT_COLUMNS])
+            with pq.ParquetWriter(handle, schema) as writer:
+                batch = []
+                for row in rows:
+                    batch.append({c: (row[c] if c == "party_size" or row[c] is None else str(row[c])) for c in EXPORT_COLUMNS})
+                    if len(batch) >= page_size:
+                        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    count += len(batch)
+        else:
+            text = io.TextIOWrapper(handle, encoding="utf-8", newline="")
+            writer = csv.DictWriter(text, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+            text.flush()
+            text.detach()
+    finally:
+        if isinstance(out, str):
+            handle.close()
+    seconds = time.perf_counter() - start
+    return {"rows": count, "seconds": seconds, "rows_per_sec": count / seconds if seconds else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import reservations from CSV/Parquet")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=["csv", "parquet"])
+    imp.add_argument("--chunk-size", type=int, default=500)
+    imp.add_argument("--dry-run", action="store_true", help="validate only")
+    exp = sub.add_parser("export", help="export reservations to CSV/Parquet")
+    exp.add_argument("path")
+    exp.add_argument("--format", choices=["csv", "parquet"])
+    exp.add_argument("--from", dest="from_date")
+    exp.add_argument("--to", dest="to_date")
+    exp.add_argument("--status")
+    exp.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from db.supabase_client import SupabaseManager
+    db = SupabaseManager()
+    fmt = _format_of(args.path, args.format)
+    if args.command == "import":
+        report = import_bookings(db, args.path, fmt, args.chunk_size, args.dry_run,
+                                 progress_callback=lambda rows, done: print(f"  {done}/{rows} rows written"))
+        for line, error in report["errors"][:50]:
+            print(f"line {line}: {error}")
+        if len(report["errors"]) > 50:
+            print(f"... and {len(report['errors']) - 50} more errors")
+        print(f"{report['imported']} of {report['rows']} rows imported in {report['seconds']:.1f}s "
+              f"({report['rows_per_sec']:.0f} rows/sec), {report['duplicates']} already present, "
+              f"{len(report['errors'])} rejected")
+    else:
+        report = export_bookings(db, args.path, fmt, args.from_date, args.to_date, args.status, args.page_size)
+        print(f"{report['rows']} rows exported to {args.path} in {report['seconds']:.1f}s "
+              f"({report['rows_per_sec']:.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+-- Single-call, idempotent booking creation used by SupabaseManager.create_booking.
+-- Run once in the Supabase SQL editor (or psql). Until it exists the app falls
+-- back to the customers upsert + reservations insert path.
+
+alter table reservations add column if not exists idempotency_key text;
+create unique index if not exists reservations_idempotency_key on reservations (idempotency_key);
+
+create or replace function create_booking(
+    p_name text,
+    p_email text,
+    p_phone text,
+    p_party_size int,
+    p_date date,
+    p_time time,
+    p_special_requests text default '',
+    p_idempotency_key text default null
+) returns json
+language plpgsql
+as $$
+declare
+    v_customer_id customers.id%type;
+    v_reservation_id reservations.id%type;
+begin
+    -- A retry with the same key returns the reservation it already created
+    if p_idempotency_key is not null then
+        select id into v_reservation_id from reservations where idempotency_key = p_idempotency_key;
+        if found then
+            return json_build_object('id', v_reservation_id, 'created', false);
+        end if;
+    end if;
+
+    insert into customers (name, email, phone)
+    values (p_name, p_email, p_phone)
+    on conflict (email) do update set name = excluded.name, phone = excluded.phone
+    returning id into v_customer_id;
+
+    insert into reservations (customer_id, party_size, reservation_date, reservation_time, special_requests, status, idempotency_key)
+    values (v_customer_id, p_party_size, p_date, p_time, coalesce(p_special_requests, ''), 'confirmed', p_idempotency_key)
+    on conflict (idempotency_key) do nothing
+    returning id into v_reservation_id;
+
+    if v_reservation_id is null then
+        -- A concurrent call with the same key got there first
+        select id into v_reservation_id from reservations where idempotency_key = p_idempotency_key;
+        return json_build_object('id', v_reservation_id, 'created', false);
+    end if;
+    return json_build_object('id', v_reservation_id, 'created', true);
+end;
+$$;
+
+grant execute on function create_booking(text, text, text, int, date, time, text, text) to anon, authenticated;
+
+-- Make PostgREST pick up the new function without a restart
+notify pgrst, 'reload schema';
@@ -0,0 +1,108 @@
+import pandas as pd
+
+DISPLAY_COLUMNS = {
+    "id": "ID",
+    "customers.name": "Customer Name",
+    "reservation_date": "Date",
+    "reservation_time": "Time",
+    "party_size": "Party Size",
+    "customers.phone": "Phone",
+    "customers.email": "Email",
+    "special_requests": "Requests",
+    "status": "Status",
+}
+
+# Watermark for a view that has loaded nothing yet
+EPOCH = "1970-01-01T00:00:00"
+
+
+def flatten_reservations(rows):
+    """Rows with an embedded `customers` object -> display DataFrame (vectorised)."""
+    df = pd.json_normalize(rows)
+    for column in DISPLAY_COLUMNS:
+        if column not in df.columns:
+            df[column] = "N/A" if column.startswith("customers.") else None
+    customer_columns = [c for c in DISPLAY_COLUMNS if c.startswith("customers.")]
+    df[customer_columns] = df[customer_columns].fillna("N/A")
+    df = df[list(DISPLAY_COLUMNS) + (["created_at"] if "created_at" in df.columns else [])]
+    return df.rename(columns=DISPLAY_COLUMNS)
+
+
+class ReservationsView:
+    """
+    Cached admin reservations table for one set of filters. Pages are loaded on
+    demand (keyset), and each refresh only asks for rows created since the
+    newest one seen, merging them into the cached DataFrame. Changes to rows
+    already loaded (a status update by another admin) need `reload()`.
+    """
+
+    def __init__(self, db, page_size=100):
+        self.db = db
+        self.page_size = page_size
+        self.filters = None
+        self.df = flatten_reservations([])
+        self.watermark = None  # newest created_at seen
+        # Keyset position of the last fetched page; refresh() deltas can sort
+        # anywhere in df, so the next page never starts from df's last row
+        self.cursor = None
+        self.has_more = False
+
+    def _advance(self, rows):
+        self.has_more = len(rows) == self.page_size
+        if rows:
+            self.cursor = (rows[-1]["reservation_date"], rows[-1]["id"])
+
+    def _merge(self, rows):
+        if not rows:
+            return
+        new = flatten_reservations(rows)
+        merged = pd.concat([self.df, new], ignore_index=True) if len(self.df) else new
+        merged = merged.drop_duplicates(subset="ID", keep="last")
+        self.df = merged.sort_values(["Date", "ID"], ascending=False, ignore_index=True)
+        created = [row["created_at"] for row in rows if row.get("created_at")]
+        if created:
+            self.watermark = max([self.watermark or ""] + created)
+
+    def set_filters(self, from_date=None, to_date=None, status=None, force=False):
+        """Switch filters; only refetches when they changed or `force` is set."""
+        filters = {"from_date": from_date, "to_date": to_date, "status": status}
+        if filters == self.filters and not force:
+            return False
+        self.filters = filters
+        self.df = flatten_reservations([])
+        self.watermark = None
+        self.cursor = None
+        rows = self.db.get_reservations(limit=self.page_size, **filters)
+        self._advance(rows)
+        self._merge(rows)
+        # Nothing matched yet: later refreshes still only ask for new rows
+        self.watermark = self.watermark or EPOCH
+        return True
+
+    def reload(self):
+        """Drop the cached rows and fetch the first page again."""
+        if self.filters is None:
+            return False
+        return self.set_filters(force=True, **self.filters)
+
+    def load_more(self):
+        if self.cursor is None:
+            return 0
+        rows = self.db.get_reservations(limit=self.page_size, after=self.cursor, **self.filters)
+        self._advance(rows)
+        self._merge(rows)
+        return len(rows)
+
+    def refresh(self):
+        """Fetch and merge reservations created since the last fetch. Returns how many."""
+        if self.filters is None:
+            return 0
+        total = 0
+        while True:
+            # Oldest-created first, so the watermark advances without gaps
+            rows = self.db.get_reservations(created_after=self.watermark, limit=self.page_size, **self.filters)
+            before = self.watermark
+            self._merge(rows)
+            total += len(rows)
+            if len(rows) < self.page_size or self.watermark == before:
+                return total
@@ -1,24 +1,90 @@
 from supabase import create_client, Client
+import functools
+import hashlib
+import json
 import os
 import sys
+import threading
 
 # Add parent directory to path to import config
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from config.config import Config
+from utils.request_coalescer import MethodTimings, RequestCoalescer
+from utils.tracing import get_tracer
+
+# One data client per process: its HTTP connection pool (keep-alive) is reused
+# by every page rerun and thread. Auth calls get their own client so a user's
+# session never ends up on the shared one.
+_shared_client = None
+_client_lock = threading.Lock()
+_coalescer = RequestCoalescer()
+# Reservation columns the pages display (rather than select("*"))
+BOOKING_COLUMNS = "id, reservation_date, reservation_time, party_size, status, special_requests"
+_timings = MethodTimings()
+# None until the first booking tells us whether the create_booking function exists
+_rpc_available = None
+
+
+def booking_idempotency_key(session_id, booking_data):
+    """Stable key for one booking in one chat session, so retries and reruns don't double-book."""
+    payload = json.dumps({"session": session_id, "booking": dict(booking_data)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _is_missing_function(error):
+    # PostgREST reports an unknown RPC as PGRST202 (HTTP 404)
+    text = f"{getattr(error, 'code', '')} {error}"
+    return "PGRST202" in text or "Could not find the function" in text
+
+
+def _credentials():
+    url = Config.SUPABASE_URL
+    key = Config.SUPABASE_KEY
+    if not url or not key:
+        raise ValueError("Supabase credentials not found in config")
+    return url, key
+
+
+def get_shared_client():
+    global _shared_client
+    if _shared_client is None:
+        with _client_lock:
+            if _shared_client is None:
+                _shared_client = create_client(*_credentials())
+    return _shared_client
+
+
+def _timed(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with get_tracer().span(f"supabase.{method.__name__}"):
+            return _timings.timed(method.__name__, method, self, *args, **kwargs)
+    return wrapper
+
+
+def _coalesced(method):
+    """Identical concurrent reads share one request."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return _coalescer.run(key, lambda: method(self, *args, **kwargs))
+    return wrapper
+
 
 class SupabaseManager:
     def __init__(self):
-        url = Config.SUPABASE_URL
-        key = Config.SUPABASE_KEY
-        if not url or not key:
-            raise ValueError("Supabase credentials not found in config")
-        
-        self.supabase: Client = create_client(url, key)
+        self.supabase: Client = get_shared_client()
 
+    @staticmethod
+    def timings():
+        """Per-method call counts and latency percentiles, plus coalesced request count."""
+        return {"methods": _timings.stats(), "coalesced": _coalescer.coalesced}
+
+    @_timed
     def sign_up(self, email, password, name, is_admin=False):
         """Register a new user in Supabase Auth"""
         try:
-            res = self.supabase.auth.sign_up({
+            res = create_client(*_credentials()).auth.sign_up({
                 "email": email, 
                 "password": password,
                 "options": {
@@ -32,10 +98,11 @@ class SupabaseManager:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    @_timed
     def sign_in(self, email, password):
         """Login existing user"""
         try:
-            res = self.supabase.auth.sign_in_with_password({
+            res = create_client(*_credentials()).auth.sign_in_with_password({
                 "email": email,
                 "password": password
             })
@@ -61,25 +128,66 @@ class SupabaseManager:
         except:
             return False
 
-    def get_user_bookings(self, user_email):
-        """Fetch bookings for a specific user (by email relation)"""
+    @_timed
+    @_coalesced
+    def get_user_bookings(self, user_email, limit=20, after=None, from_date=None, to_date=None):
+        """
+        Fetch one page of bookings for a user (by email relation), newest first.
+        `after` is the (reservation_date, id) of the last row of the previous page;
+        `from_date`/`to_date` optionally bound the dates returned.
+        """
         try:
-            # We are joining with customers table on email
-            # First find customer_id for this email
-            cust_res = self.supabase.table("customers").select("id").eq("email", user_email).execute()
-            if not cust_res.data:
-                return []
-            
-            cust_id = cust_res.data[0]['id']
-            res = self.supabase.table("reservations").select("*").eq("customer_id", cust_id).order("reservation_date", desc=True).execute()
+            # customers!inner filters reservations by the joined email in the same request
+            query = (
+                self.supabase.table("reservations")
+                .select(f"{BOOKING_COLUMNS}, customers!inner(email)")
+                .eq("customers.email", user_email)
+            )
+            if from_date:
+                query = query.gte("reservation_date", from_date)
+            if to_date:
+                query = query.lte("reservation_date", to_date)
+            if after:
+                # Keyset pagination: strictly after the last row seen, in sort order
+                last_date, last_id = after
+                query = query.or_(f"reservation_date.lt.{last_date},and(reservation_date.eq.{last_date},id.lt.{last_id})")
+            res = query.order("reservation_date", desc=True).order("id", desc=True).limit(limit).execute()
             return res.data
         except Exception as e:
+            print(f"Error fetching user bookings: {e}")
             return []
 
-    def create_booking(self, booking_data):
+    @_timed
+    def create_booking(self, booking_data, idempotency_key=None):
         """
         Create a new booking/reservation.
+        Uses the create_booking database function (one round trip, safe to retry
+        with the same idempotency_key) and falls back to separate customer and
+        reservation requests if that function hasn't been installed.
+        Returns {"success", "data": [{"id": ...}], "created"}; created is False
+        when the key matched a booking made earlier.
         """
+        global _rpc_available
+        if Config.BOOKING_RPC and _rpc_available is not False:
+            try:
+                res = self.supabase.rpc("create_booking", {
+                    "p_name": booking_data.get("name"),
+                    "p_email": booking_data.get("email"),
+                    "p_phone": booking_data.get("phone"),
+                    "p_party_size": int(booking_data.get("party_size")),
+                    "p_date": booking_data.get("date"),
+                    "p_time": booking_data.get("time"),
+                    "p_special_requests": booking_data.get("special_requests", ""),
+                    "p_idempotency_key": idempotency_key,
+                }).execute()
+                _rpc_available = True
+                return {"success": True, "data": [{"id": res.data["id"]}], "created": res.data["created"]}
+            except Exception as e:
+                if not _is_missing_function(e):
+                    return {"success": False, "error": str(e)}
+                _rpc_available = False
+                print("create_booking function not found; see db/migrations. Using separate requests.")
+
         try:
             customer_data = {
                 "name": booking_data.get("name"),
@@ -104,11 +212,116 @@ class SupabaseManager:
             }
             
             res = self.supabase.table("reservations").insert(reservation_data).execute()
-            return {"success": True, "data": res.data}
+            return {"success": True, "data": res.data, "created": True}
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
+    @_timed
+    def upsert_customers(self, customers):
+        """
+        Batch upsert of customer rows (keyed on email). Returns [{"id", "email"}].
+        Rows without a phone only create new customers; an existing customer
+        keeps the details already on file rather than losing their phone number.
+        """
+        with_phone = [c for c in customers if c.get("phone")]
+        without_phone = [{**c, "phone": ""} for c in customers if not c.get("phone")]
+        rows = []
+        if with_phone:
+            rows += self.supabase.table("customers").upsert(with_phone, on_conflict="email").execute().data
+        if without_phone:
+            self.supabase.table("customers").upsert(without_phone, on_conflict="email", ignore_duplicates=True).execute()
+            # ignore_duplicates returns only the new rows; look up everyone's id
+            emails = [c["email"] for c in without_phone]
+            rows += self.supabase.table("customers").select("id, email").in_("email", emails).execute().data
+        return rows
+
+    @_timed
+    def existing_reservation_ids(self, ids):
+        """The subset of `ids` that are already reservations (as strings)."""
+        res = self.supabase.table("reservations").select("id").in_("id", list(ids)).execute()
+        return {str(row["id"]) for row in res.data}
+
+    @_timed
+    def insert_reservations(self, reservations):
+        """
+        Batch insert; rows carry an idempotency_key (db/migrations) so a
+        re-run import skips rows that are already there. Returns inserted rows.
+        """
+        res = (
+            self.supabase.table("reservations")
+            .upsert(reservations, on_conflict="idempotency_key", ignore_duplicates=True)
+            .execute()
+        )
+        return res.data
+
+    @_timed
+    @_coalesced
+    def get_upcoming_reservations(self, from_date):
+        """Date, time and party size of every reservation from `from_date` on (for availability)"""
+        try:
+            res = (
+                self.supabase.table("reservations")
+                .select("reservation_date, reservation_time, party_size, status")
+                .gte("reservation_date", from_date)
+                .neq("status", "cancelled")
+                .execute()
+            )
+            return res.data
+        except Exception as e:
+            print(f"Error fetching reservations: {e}")
+            return []
+
+    @_timed
+    @_coalesced
+    def get_reservations(self, from_date=None, to_date=None, status=None, after=None, created_after=None, limit=100):
+        """
+        Admin listing with server-side filters, newest reservation date first.
+        `after` is the (reservation_date, id) of the last row already loaded;
+        `created_after` returns only rows created since that timestamp, oldest first.
+        """
+        try:
+            query = self.supabase.table("reservations").select(f"{BOOKING_COLUMNS}, created_at, customers(name, email, phone)")
+            if from_date:
+                query = query.gte("reservation_date", from_date)
+            if to_date:
+                query = query.lte("reservation_date", to_date)
+            if status:
+                query = query.eq("status", status)
+            if after:
+                last_date, last_id = after
+                query = query.or_(f"reservation_date.lt.{last_date},and(reservation_date.eq.{last_date},id.lt.{last_id})")
+            if created_after:
+                # Delta mode: oldest-created first so callers can page by created_at
+                query = query.gt("created_at", created_after).order("created_at")
+            else:
+                query = query.order("reservation_date", desc=True).order("id", desc=True)
+            res = query.limit(limit).execute()
+            return res.data
+        except Exception as e:
+            print(f"Error fetching reservations: {e}")
+            return []
+
+    @_timed
+    def update_reservation_status(self, reservation_id, status):
+        """
+        Set a reservation's status, e.g. completed or no_show after the visit.
+        Returns {"success", "data": [updated row with customer]} or {"success", "error"}.
+        """
+        try:
+            self.supabase.table("reservations").update({"status": status}).eq("id", reservation_id).execute()
+            res = (
+                self.supabase.table("reservations")
+                .select(f"{BOOKING_COLUMNS}, created_at, customers(name, email, phone)")
+                .eq("id", reservation_id)
+                .execute()
+            )
+            return {"success": True, "data": res.data}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    @_timed
+    @_coalesced
     def get_all_bookings(self):
         """Fetch all bookings for admin dashboard"""
         try:
@@ -0,0 +1,124 @@
+from collections import Counter, namedtuple
+import re
+import threading
+
+import numpy as np
+
+# Result of one intent decision.
+# tier is one of "keyword", "embedding" or "llm" so callers can see who answered.
+IntentDecision = namedtuple("IntentDecision", ["intent", "tier", "confidence"])
+
+# Whole words only, so every form is listed ("bookshelf", "tablet" and
+# "reserved parking" are not bookings)
+BOOKING_KEYWORDS = [
+    "book", "booking", "bookings", "reservation", "reservations", "reserve",
+    "table", "tables", "appointment", "appointments",
+]
+
+# A handful of labelled examples per intent. Their embeddings act as a tiny
+# nearest-centroid classifier on top of the MiniLM model the RAG pipeline loads.
+INTENT_EXAMPLES = {
+    "BOOKING": [
+        "I'd like to make a booking",
+        "Can I get a table for two tonight?",
+        "I want to reserve for Friday evening",
+        "Do you have space for 6 people tomorrow at 8pm?",
+        "Please book dinner for my family",
+        "Can we come in on Saturday for a birthday dinner?",
+    ],
+    "QUERY": [
+        "What are your opening hours?",
+        "Is there a vegan option on the menu?",
+        "How much is the steak?",
+        "What desserts do you have?",
+        "Where are you located?",
+        "What is your cancellation policy?",
+        "Is there a dress code?",
+        "Do you serve gluten free dishes?",
+    ],
+    "OTHER": [
+        "Hello there",
+        "Thanks, that's all",
+        "How are you today?",
+        "Tell me a joke",
+        "Good evening!",
+        "Who are you?",
+    ],
+}
+
+
+class IntentClassifier:
+    """
+    Tiered intent detection: keywords first, then embedding similarity,
+    and the LLM only when neither of the local tiers is confident.
+    """
+
+    def __init__(self, embed_query, llm_classify=None, min_similarity=0.35, min_margin=0.05):
+        # embed_query: text -> vector (we reuse RAGPipeline.embed_query)
+        # llm_classify: text -> "BOOKING" | "QUERY" | "OTHER" (slow fallback)
+        self.embed_query = embed_query
+        self.llm_classify = llm_classify
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.tier_counts = Counter()
+        self._centroids = None
+        self._lock = threading.Lock()
+        self._keyword_re = re.compile(r"\b(" + "|".join(BOOKING_KEYWORDS) + r")\b", re.IGNORECASE)
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _get_centroids(self):
+        # Embed the examples lazily, once per process
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    centroids = {}
+                    for intent, examples in INTENT_EXAMPLES.items():
+                        vectors = [self._normalize(self.embed_query(e)) for e in examples]
+                        centroids[intent] = self._normalize(np.mean(vectors, axis=0))
+                    self._centroids = centroids
+        return self._centroids
+
+    def warm_up(self):
+        self._get_centroids()
+
+    def _record(self, decision):
+        self.tier_counts[decision.tier] += 1
+        return decision
+
+    def classify(self, user_input):
+        # Tier 1: keywords decide booking intent outright
+        if self._keyword_re.search(user_input):
+            return self._record(IntentDecision("BOOKING", "keyword", 1.0))
+
+        # Tier 2: nearest centroid over the example embeddings
+        best_intent, confidence = None, 0.0
+        try:
+            centroids = self._get_centroids()
+            query_vec = self._normalize(self.embed_query(user_input))
+            scores = sorted(
+                ((float(np.dot(query_vec, c)), intent) for intent, c in centroids.items()),
+                reverse=True
+            )
+            confidence, best_intent = scores[0]
+            margin = confidence - scores[1][0]
+            if confidence >= self.min_similarity and margin >= self.min_margin:
+                return self._record(IntentDecision(best_intent, "embedding", confidence))
+        except Exception as e:
+            print(f"Embedding intent classifier failed: {e}")
+
+        # Tier 3: ask the LLM
+        if self.llm_classify is not None:
+            try:
+                return self._record(IntentDecision(self.llm_classify(user_input), "llm", None))
+            except Exception as e:
+                print(f"LLM intent classification failed: {e}")
+
+        # Nothing confident and no LLM available; take the best local guess
+        return self._record(IntentDecision(best_intent or "QUERY", "embedding", confidence))
+
+    def stats(self):
+        return dict(self.tier_counts)
@@ -0,0 +1,239 @@
+from collections import namedtuple
+import json
+import os
+import re
+import threading
+
+MenuItem = namedtuple("MenuItem", ["name", "category", "price", "description", "tags", "doc_id"])
+
+# "- Supernova Steak ($55): Dry-aged Ribeye with gold-leaf butter."
+ITEM_RE = re.compile(
+    r"^\s*[-•*]?\s*(?P<name>[A-Za-z][^($\n]*?)\s*\(\s*\$\s*(?P<price>\d+(?:\.\d{1,2})?)\s*\)\s*[:\-–]?\s*(?P<desc>.*)$"
+)
+# "Supernova Steak ..... $55" (no description)
+TRAILING_PRICE_RE = re.compile(r"^\s*[-•*]?\s*(?P<name>[A-Za-z][^$\n]*?)[\s.:\-–]*\$\s*(?P<price>\d+(?:\.\d{1,2})?)\s*$")
+HEADER_RE = re.compile(r"^\s*(?P<header>[A-Za-z][A-Za-z &/]{2,40}):\s*$")
+
+# Canonical category -> words that refer to it, in headers and in questions
+CATEGORIES = {
+    "Appetizers": ["appetizer", "appetiser", "starter", "small plate"],
+    "Main Courses": ["main", "entree", "main course"],
+    "Desserts": ["dessert", "sweet", "pudding"],
+    "Drinks": ["drink", "beverage", "wine", "cocktail", "beer"],
+    "Sides": ["side"],
+}
+
+MEAT_WORDS = ["beef", "wagyu", "steak", "ribeye", "chicken", "pork", "lamb", "duck", "bacon", "ham", "veal", "venison", "sausage", "prosciutto"]
+SEAFOOD_WORDS = ["scallop", "fish", "salmon", "tuna", "shrimp", "prawn", "lobster", "crab", "oyster", "clam", "mussel", "anchovy", "anchovies", "caviar", "octopus", "squid"]
+ANIMAL_PRODUCT_WORDS = ["cheese", "parmesan", "butter", "cream", "milk", "egg", "honey", "cake", "yogurt", "yoghurt", "custard", "mayo", "aioli"]
+
+DIETARY_QUERY_WORDS = {
+    "vegan": ["vegan", "plant-based", "plant based", "dairy-free", "dairy free"],
+    "vegetarian": ["vegetarian", "veggie", "meat-free", "meat free", "no meat"],
+    "pescatarian": ["pescatarian", "seafood", "fish"],
+    "gluten-free": ["gluten-free", "gluten free", "coeliac", "celiac"],
+}
+
+PRICE_WORDS = ["price", "cost", "how much", "how expensive"]
+MENU_WORDS = ["menu", "dish", "dishes", "serve", "options", "option", "food", "eat", "have"]
+# Price limits ("under 20", "more than 10") only count in questions about food or prices
+DISH_WORDS = ["dish", "food", "meal", "plate", "eat", "item", "menu", "cheap", "dollar"]
+
+
+def _contains(text, words):
+    # Whole words, allowing a plural ("mains", "dishes")
+    return any(re.search(r"\b" + re.escape(w) + r"(?:s|es)?\b", text) for w in words)
+
+
+def _singular(label):
+    if label.endswith("dishes"):
+        return label[:-2]
+    return label[:-1] if label.endswith("s") else label
+
+
+def canonical_category(header):
+    lowered = header.lower()
+    for category, words in CATEGORIES.items():
+        if _contains(lowered, words):
+            return category
+    return header.strip().title()
+
+
+def infer_tags(name, description):
+    """Best-effort dietary tags from the dish text; explicit labels win."""
+    text = f"{name} {description}".lower()
+    tags = set()
+    has_meat = _contains(text, MEAT_WORDS)
+    has_seafood = _contains(text, SEAFOOD_WORDS)
+    if not has_meat and not has_seafood:
+        tags.add("vegetarian")
+        if not _contains(text, ANIMAL_PRODUCT_WORDS):
+            tags.add("vegan")
+    elif has_seafood and not has_meat:
+        tags.add("pescatarian")
+    if re.search(r"\b(vegan|\(vg\))", text):
+        tags.update({"vegan", "vegetarian"})
+    if re.search(r"\b(vegetarian|\(v\))", text):
+        tags.add("vegetarian")
+    if re.search(r"gluten[- ]free|\(gf\)", text):
+        tags.add("gluten-free")
+    return tuple(sorted(tags))
+
+
+class MenuParser:
+    """Pulls priced items out of menu text, tracking the current section header across pages."""
+
+    def __init__(self, doc_id):
+        self.doc_id = doc_id
+        self.category = None
+        self.items = []
+
+    def feed(self, text):
+        for line in text.splitlines():
+            match = ITEM_RE.match(line) or TRAILING_PRICE_RE.match(line)
+            if match and self.category:
+                name = match.group("name").strip(" .-–:")
+                description = match.groupdict().get("desc") or ""
+                self.items.append(MenuItem(
+                    name=name,
+                    category=self.category,
+                    price=float(match.group("price")),
+                    description=description.strip(),
+                    tags=infer_tags(name, description),
+                    doc_id=self.doc_id,
+                ))
+                continue
+            header = HEADER_RE.match(line)
+            if header:
+                category = canonical_category(header.group("header"))
+                # Only sections we recognise as food/drink hold menu items
+                self.category = category if category in CATEGORIES else None
+        return self
+
+
+class MenuIndex:
+    """
+    Typed in-memory index of menu items (by name, category, price and dietary
+    tag) that answers common menu questions without retrieval or the LLM.
+    `answer()` returns None whenever a question isn't clearly one it handles.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._items = {}  # doc_id -> [MenuItem]
+        self._transient = set()  # doc ids kept in memory only
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            for doc_id, items in saved.items():
+                self._items[doc_id] = [MenuItem(**{**item, "tags": tuple(item["tags"])}) for item in items]
+
+    @property
+    def items(self):
+        with self._lock:
+            return [item for items in self._items.values() for item in items]
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        persisted = {doc_id: items for doc_id, items in self._items.items() if doc_id not in self._transient}
+        with open(self.path, "w") as f:
+            json.dump({doc_id: [item._asdict() for item in items] for doc_id, items in persisted.items()}, f, indent=2)
+
+    def replace_document(self, doc_id, items, persist=True):
+        """Set one document's items (an empty list removes the document)."""
+        with self._lock:
+            if items:
+                self._items[doc_id] = list(items)
+            else:
+                self._items.pop(doc_id, None)
+            if persist:
+                self._transient.discard(doc_id)
+                self._save()
+            else:
+                self._transient.add(doc_id)
+
+    def remove_document(self, doc_id):
+        self.replace_document(doc_id, [])
+
+    def has_document(self, doc_id):
+        with self._lock:
+            return doc_id in self._items
+
+    # --- Query side ---
+
+    def _find_dish(self, question, items):
+        """A dish named in the question (full name, or a word unique to one dish)."""
+        for item in sorted(items, key=lambda i: -len(i.name)):
+            if item.name.lower() in question:
+                return item
+        words = set(re.findall(r"[a-z]{4,}", question))
+        matches = [i for i in items if words & set(re.findall(r"[a-z]{4,}", i.name.lower()))]
+        unique = {i.name: i for i in matches}
+        return next(iter(unique.values())) if len(unique) == 1 else None
+
+    def _filters(self, question):
+        category = next((c for c, words in CATEGORIES.items() if _contains(question, words)), None)
+        diet = next((d for d, words in DIETARY_QUERY_WORDS.items() if _contains(question, words)), None)
+        if not (category or diet or "$" in question or _contains(question, DISH_WORDS + PRICE_WORDS)):
+            # "parking for more than 10 cars" is not a price filter
+            return category, diet, None, None
+        below = re.search(r"(?:under|below|less than|cheaper than|max(?:imum)?)\s*\$?\s*(\d+)", question)
+        above = re.search(r"(?:over|above|more than)\s*\$?\s*(\d+)", question)
+        return category, diet, float(below.group(1)) if below else None, float(above.group(1)) if above else None
+
+    @staticmethod
+    def _format(item):
+        description = item.description.rstrip(".")
+        return f"**{item.name}** (${item.price:g}) — {description}" if description else f"**{item.name}** (${item.price:g})"
+
+    def answer(self, question):
+        items = self.items
+        if not items:
+            return None
+        q = question.lower()
+        category, diet, max_price, min_price = self._filters(q)
+
+        # "How much is the steak?"
+        if _contains(q, PRICE_WORDS) and not (_contains(q, ["cheapest", "expensive"]) and category):
+            dish = self._find_dish(q, items)
+            if dish:
+                return f"The {self._format(dish)}."
+            return None
+
+        # Anything else naming a specific dish (ingredients, allergens...) needs the full text
+        if self._find_dish(q, items) and not category:
+            return None
+
+        selected = [
+            i for i in items
+            if (category is None or i.category == category)
+            and (diet is None or diet in i.tags)
+            and (max_price is None or i.price <= max_price)
+            and (min_price is None or i.price >= min_price)
+        ]
+        label = " ".join(filter(None, [diet, category.lower() if category else "dishes"]))
+        if not selected:
+            # The parsed menu may simply not cover it (drinks list, sides, untagged
+            # dishes); let retrieval answer rather than claim we have none
+            return None
+        note = "\n\n_Dietary labels are based on the menu descriptions; please mention any allergies when you book._" if diet else ""
+
+        if _contains(q, ["cheapest", "least expensive", "lowest price", "most affordable"]):
+            best = min(selected, key=lambda i: i.price)
+            return f"Our most affordable {_singular(label)} is the {self._format(best)}." + note
+
+        if _contains(q, ["most expensive", "priciest", "highest price"]):
+            best = max(selected, key=lambda i: i.price)
+            return f"Our most premium {_singular(label)} is the {self._format(best)}." + note
+
+        # "vegetarian mains", "desserts under $15"
+        if category or diet or max_price is not None or min_price is not None:
+            if not _contains(q, MENU_WORDS + ["what", "which", "any", "anything", "list", "show"]) and not (category or diet):
+                return None
+            lines = [f"- {self._format(i)}" for i in selected]
+            return f"Here are our {label}:\n" + "\n".join(lines) + note
+
+        return None
@@ -0,0 +1,274 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process locking; one process per cache directory there
+    fcntl = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    HuggingFace embeddings behind a persistent, content-addressed cache.
+
+    Vectors live in a memory-mapped float32 file with one row per slot; a JSON
+    index maps sha256(text) -> slot in LRU order. Once `max_entries` slots are
+    used the least recently used entry's slot is reused. The cache directory is
+    namespaced by model name, and caches for other models are removed, so
+    switching models never serves stale vectors. Only document vectors are
+    stored: `embed_query` reads the cache but leaves chat queries to the
+    caller's in-memory cache (RAGPipeline.embed_query), so user traffic
+    can't evict chunk embeddings.
+
+    Several processes may share one cache. Writes take an fcntl lock on
+    `<cache_dir>.lock`, and a second memmap records which key owns each slot,
+    so a slot another process has reused reads as a miss rather than a wrong
+    vector.
+    """
+
+    MARKER = ".cached-embeddings"
+
+    def __init__(self, model_name, cache_dir="embedding_cache", max_entries=50000, encode_kwargs=None):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.encode_kwargs = encode_kwargs or {}
+        self.root_dir = cache_dir
+        self.cache_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self.meta_path = os.path.join(self.cache_dir, "meta.json")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self.keys_path = os.path.join(self.cache_dir, "keys.bin")
+        self.lock_path = self.cache_dir + ".lock"
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._dim = None
+        self._vectors = None
+        self._keys = None  # slot -> owning text hash, shared between processes
+        self._index = OrderedDict()  # text hash -> slot, least recently used first
+        self._dirty = False
+        self._last_persist = 0.0
+        self._lock = threading.RLock()
+        self._open()
+        atexit.register(self.persist)
+
+    @property
+    def model(self):
+        # Load sentence-transformers only when something actually misses the cache
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    print(f"Loading HuggingFace Embeddings ({self.model_name})...")
+                    self._model = HuggingFaceEmbeddings(model_name=self.model_name, encode_kwargs=self.encode_kwargs)
+        return self._model
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.root_dir, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _prune_other_models(self):
+        # Only directories this class created, and only while nobody is writing them
+        for name in os.listdir(self.root_dir):
+            path = os.path.join(self.root_dir, name)
+            if path == self.cache_dir or not os.path.isfile(os.path.join(path, self.MARKER)):
+                continue
+            if fcntl is None:
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            with open(path + ".lock", "a") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                fcntl.flock(f, fcntl.LOCK_UN)
+            try:
+                os.remove(path + ".lock")
+            except OSError:
+                pass
+
+    def _open(self):
+        with self._file_lock():
+            self._prune_other_models()
+            if not os.path.exists(self.meta_path):
+                return
+            try:
+                self._attach()
+                entries = []
+                if os.path.exists(self.index_path):
+                    with open(self.index_path) as f:
+                        entries = json.load(f)
+                self._index = OrderedDict(self._valid(entries))
+            except Exception as e:
+                print(f"Discarding embedding cache: {e}")
+                shutil.rmtree(self.cache_dir, ignore_errors=True)
+                self._dim, self._vectors, self._keys, self._index = None, None, None, OrderedDict()
+
+    def _attach(self):
+        """Map the files another process (or an earlier run) created."""
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if meta["model_name"] != self.model_name or meta["max_entries"] != self.max_entries:
+            raise ValueError("cache was written with different settings")
+        self._dim = meta["dim"]
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self.max_entries, self._dim))
+        self._keys = np.memmap(self.keys_path, dtype="S32", mode="r+", shape=(self.max_entries,))
+
+    def _create(self, dim):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._dim = dim
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="w+", shape=(self.max_entries, dim))
+        self._keys = np.memmap(self.keys_path, dtype="S32", mode="w+", shape=(self.max_entries,))
+        with open(os.path.join(self.cache_dir, self.MARKER), "w"):
+            pass
+        with open(self.meta_path, "w") as f:
+            json.dump({"model_name": self.model_name, "dim": dim, "max_entries": self.max_entries}, f)
+
+    def _valid(self, entries):
+        """(key, slot) pairs whose slot still holds that key."""
+        return [(key, slot) for key, slot in entries if self._keys[slot] == key.encode()]
+
+    @staticmethod
+    def _key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+    def _lookup(self, key):
+        slot = self._index.get(key)
+        if slot is None:
+            return None
+        vector = self._vectors[slot].tolist()
+        # Checked after the read: a writer clears the key before touching the row
+        if self._keys[slot] != key.encode():
+            del self._index[key]
+            return None
+        self._index.move_to_end(key)
+        return vector
+
+    def _store_all(self, pairs):
+        """Write (key, vector) pairs; call with self._lock held."""
+        with self._file_lock():
+            if self._vectors is None:
+                if os.path.exists(self.meta_path):
+                    self._attach()
+                else:
+                    self._create(len(pairs[0][1]))
+            for key, vector in pairs:
+                self._store(key, vector)
+            self._vectors.flush()
+            self._keys.flush()
+
+    def _store(self, key, vector):
+        free = np.flatnonzero(self._keys == b"")
+        if len(free):
+            slot = int(free[0])
+        else:
+            # Evict our least recently used entry; other processes' entries are
+            # invisible here, so fall back to an arbitrary slot
+            slot = None
+            while self._index and slot is None:
+                old_key, old_slot = self._index.popitem(last=False)
+                if self._keys[old_slot] == old_key.encode():
+                    slot = old_slot
+            if slot is None:
+                slot = int(np.random.randint(self.max_entries))
+        previous = self._keys[slot].decode()
+        if self._index.get(previous) == slot:
+            del self._index[previous]
+        self._keys[slot] = b""
+        self._vectors[slot] = vector
+        self._keys[slot] = key.encode()
+        self._index[key] = slot
+        self._dirty = True
+
+    def persist(self, force=True):
+        """Flush vectors and the hash index to disk."""
+        with self._lock:
+            if not self._dirty or self._vectors is None:
+                return
+            if not force and time.time() - self._last_persist < 5:
+                return
+            with self._file_lock():
+                # Keep other processes' entries, least recent first, then ours
+                entries = []
+                if os.path.exists(self.index_path):
+                    with open(self.index_path) as f:
+                        entries = [(k, s) for k, s in self._valid(json.load(f)) if k not in self._index]
+                entries += self._valid(self._index.items())
+                tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.index_path)
+            self._dirty = False
+            self._last_persist = time.time()
+
+    def embed_documents(self, texts):
+        keys = [self._key(t) for t in texts]
+        results = [None] * len(texts)
+        missing = {}  # key -> (text, [positions])
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._lookup(key) if self._vectors is not None else None
+                if vector is not None:
+                    results[i] = vector
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, (texts[i], []))[1].append(i)
+
+        if missing:
+            computed = self.model.embed_documents([text for text, _ in missing.values()])
+            with self._lock:
+                self._store_all([(key, np.asarray(vector, dtype=np.float32)) for key, vector in zip(missing, computed)])
+                for (_, positions), vector in zip(missing.values(), computed):
+                    for i in positions:
+                        results[i] = list(vector)
+                    self.misses += len(positions)
+            self.persist(force=False)
+        return results
+
+    def embed_query(self, text):
+        key = self._key(text)
+        with self._lock:
+            vector = self._lookup(key) if self._vectors is not None else None
+            if vector is not None:
+                self.hits += 1
+                return vector
+
+        vector = self.model.embed_query(text)
+        with self._lock:
+            self.misses += 1
+        return vector
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": len(self._index),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
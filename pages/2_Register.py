@@ -42,45 +42,17 @@ with st.container():
                  st.error("Invalid Admin Secret Key")
             else:
                 with st.spinner("Creating account..."):
-                    try:
-                        # Direct client connection for robust environment handling
-                        from supabase import create_client
-                        import os
-                        
-                        d_url = os.environ.get("SUPABASE_URL")
-                        d_key = os.environ.get("SUPABASE_KEY")
-                        
-                        if not d_url or not d_key:
-                             # Fallback to config if env not direct (shouldn't happen with .env loaded)
-                             from config.config import Config
-                             d_url = Config.SUPABASE_URL
-                             d_key = Config.SUPABASE_KEY
-
-                        # Init direct client
-                        direct_client = create_client(d_url, d_key)
-                        
-                        # Register user
-                        res = direct_client.auth.sign_up({
-                            "email": email,
-                            "password": password,
-                            "options": {
-                                "data": { 
-                                    "full_name": name,
-                                    "is_admin": is_admin_reg
-                                } 
-                            }
-                        })
-                        
-                        if res.user:
-                             role = "Admin" if is_admin_reg else "Guest"
-                             st.success(f"{role} Account created! You can now Login.")
-                             time.sleep(2)
-                             st.switch_page("pages/1_Login.py")
-                        else:
-                             st.error("Registration failed. Please try again.")
-                             
-                    except Exception as e:
-                         st.error(f"Registration failed: {str(e)}")
+                    # Uses its own short-lived client, so no session lands on the shared one
+                    res = db.sign_up(email, password, name, is_admin=is_admin_reg)
+                    if res["success"] and res["data"].user:
+                         role = "Admin" if is_admin_reg else "Guest"
+                         st.success(f"{role} Account created! You can now Login.")
+                         time.sleep(2)
+                         st.switch_page("pages/1_Login.py")
+                    elif res["success"]:
+                         st.error("Registration failed. Please try again.")
+                    else:
+                         st.error(f"Registration failed: {res['error']}")
         else:
             st.warning("Please fill in all fields")
     st.markdown('</div>', unsafe_allow_html=True)
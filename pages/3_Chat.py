@@ -4,7 +4,7 @@ import sys
 
 # Add parent path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from chat_logic import ChatLogic
+from chat_logic import get_chat_logic
 
 st.set_page_config(page_title="Reservation - Starwalk Dining", page_icon="🍽️", layout="wide")
 
@@ -19,10 +19,7 @@ if not st.session_state.get("logged_in", False):
     st.warning("Please Login to make a reservation.")
     st.stop()
 
-@st.cache_resource
-def get_chat_logic():
-    return ChatLogic()
-
+# Shared with the Admin page: one RAG index, answer cache and session map per process
 logic = get_chat_logic()
 
 # Use First Name
@@ -41,6 +38,8 @@ with st.sidebar:
     
     if st.button("Clear Chat"):
         st.session_state.messages = []
+        if "session_id" in st.session_state:
+            logic.end_session(st.session_state.session_id)
         import uuid
         st.session_state.session_id = str(uuid.uuid4())
         # Reset simple chat history for RAG context if needed
@@ -54,6 +53,22 @@ if "session_id" not in st.session_state:
     import uuid
     st.session_state.session_id = str(uuid.uuid4())
 
+# Confirmation email status (polled while the background worker sends it)
+@st.fragment(run_every=3)
+def email_status_panel():
+    status = logic.get_email_status(st.session_state.session_id)
+    if not status:
+        return
+    if status["status"] == "sent":
+        st.success("📧 Confirmation email sent.")
+    elif status["status"] == "failed":
+        st.error(f"⚠️ Confirmation email failed: {status.get('error')}")
+    else:
+        st.info(f"📧 Sending confirmation email... (attempt {status['attempts'] or 1})")
+
+with st.sidebar:
+    email_status_panel()
+
 # Display Chat
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -67,9 +82,10 @@ if prompt := st.chat_input("I'd like to book a table..."):
 
     # Assistant response
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            lc_history = [] # simplify
-            response = logic.process_message(st.session_state.session_id, prompt, lc_history)
-            st.markdown(response)
+        lc_history = [] # simplify
+        # Render tokens as they arrive instead of waiting for the full reply
+        response = st.write_stream(
+            logic.process_message_stream(st.session_state.session_id, prompt, lc_history)
+        )
     
     st.session_state.messages.append({"role": "assistant", "content": response})
@@ -5,6 +5,7 @@ import pandas as pd
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from db.supabase_client import SupabaseManager
+from config.config import Config
 
 st.set_page_config(page_title="My Profile - Starwalk Dining", page_icon="👤", layout="wide")
 
@@ -26,7 +27,20 @@ with st.container():
     st.markdown('<div class="glass-container">', unsafe_allow_html=True)
     st.subheader("Your Reservations")
     
-    bookings = db.get_user_bookings(st.session_state.user['email'])
+    # First page is fetched on every visit (new bookings show up at the top);
+    # older pages loaded with "Load more" are kept in the session
+    email = st.session_state.user['email']
+    page_size = Config.BOOKINGS_PAGE_SIZE
+    if st.session_state.get("profile_bookings_email") != email:
+        st.session_state.profile_bookings_email = email
+        st.session_state.profile_older = []
+        st.session_state.profile_has_more = None
+    first_page = db.get_user_bookings(email, limit=page_size)
+    first_ids = {row["id"] for row in first_page}
+    bookings = first_page + [row for row in st.session_state.profile_older if row["id"] not in first_ids]
+    has_more = st.session_state.profile_has_more
+    if has_more is None:
+        has_more = len(first_page) == page_size
     
     if bookings:
         # Convert to nice DataFrame
@@ -47,6 +61,14 @@ with st.container():
         cols = [c for c in cols_to_show if c in df.columns]
         
         st.dataframe(df[cols], use_container_width=True, hide_index=True)
+
+        # A full page means there may be more
+        if has_more and st.button("Load more"):
+            last = bookings[-1]
+            more = db.get_user_bookings(email, limit=page_size, after=(last["reservation_date"], last["id"]))
+            st.session_state.profile_older = st.session_state.profile_older + more
+            st.session_state.profile_has_more = len(more) == page_size
+            st.rerun()
     else:
         st.info("You have no past reservations.")
     
@@ -4,7 +4,12 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from db.supabase_client import SupabaseManager
-from chat_logic import ChatLogic
+from db.reservations_view import ReservationsView
+from db.bulk import STATUSES, export_bookings, import_bookings
+from db.analytics import get_reservation_analytics
+from config.config import Config
+from chat_logic import get_chat_logic
+from utils.tracing import get_tracer
 
 st.set_page_config(page_title="Admin Dashboard - Starwalk Dining", page_icon="🔒", layout="wide")
 
@@ -29,48 +34,55 @@ if not st.session_state.get("logged_in", False):
 st.success(f"🔓 Admin Access Granted (Test Mode) for: {st.session_state.user.get('name', st.session_state.user.get('email'))}")
 
 db = SupabaseManager()
-# We need ChatLogic to access RAG ingestion
-@st.cache_resource
-def get_logic():
-    return ChatLogic()
-
-logic = get_logic()
+# We need ChatLogic to access RAG ingestion (same instance the Chat page uses)
+logic = get_chat_logic()
 
 st.title("🔒 Admin Dashboard")
 
-tab1, tab2 = st.tabs(["📊 Reservations", "📚 Knowledge Base"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["📊 Reservations", "📚 Knowledge Base", "📦 Import / Export", "📈 Analytics", "⏱️ Performance"])
 
 with tab1:
     st.subheader("All Reservations")
-    bookings = db.get_all_bookings()
-    if bookings:
-        # Flatten and Formatting
-        import pandas as pd
-        df = pd.DataFrame(bookings)
-        
-        # Flatten 'customers' dict if present
-        if 'customers' in df.columns:
-            # Safe extraction
-            df['Customer Name'] = df['customers'].apply(lambda x: x.get('name') if isinstance(x, dict) else 'N/A')
-            df['Email'] = df['customers'].apply(lambda x: x.get('email') if isinstance(x, dict) else 'N/A')
-            df['Phone'] = df['customers'].apply(lambda x: x.get('phone') if isinstance(x, dict) else 'N/A')
-        
-        # Rename other columns
-        df = df.rename(columns={
-            "reservation_date": "Date",
-            "reservation_time": "Time",
-            "party_size": "Party Size",
-            "special_requests": "Requests",
-            "status": "Status",
-            "id": "ID"
-        })
-        
-        # Select and Order Columns
-        cols = ["ID", "Customer Name", "Date", "Time", "Party Size", "Phone", "Email", "Requests", "Status"]
-        # Filter only existing columns just in case
-        cols = [c for c in cols if c in df.columns]
-        
-        st.dataframe(df[cols], use_container_width=True, hide_index=True)
+    # Filters run server-side; the table is cached per session and only
+    # reservations created since the last fetch are pulled on each rerun
+    col_from, col_to, col_status = st.columns(3)
+    from_date = col_from.date_input("From", value=None)
+    to_date = col_to.date_input("To", value=None)
+    status = col_status.selectbox("Status", ["All"] + sorted(STATUSES))
+
+    if "reservations_view" not in st.session_state:
+        st.session_state.reservations_view = ReservationsView(db, page_size=Config.ADMIN_PAGE_SIZE)
+    view = st.session_state.reservations_view
+    changed = view.set_filters(
+        from_date=from_date.isoformat() if from_date else None,
+        to_date=to_date.isoformat() if to_date else None,
+        status=None if status == "All" else status
+    )
+    if not changed:
+        view.refresh()
+    # New bookings arrive on every rerun; edits to loaded rows need a reload
+    if st.button("🔄 Refresh"):
+        view.reload()
+
+    if len(view.df):
+        st.dataframe(view.df.drop(columns=["created_at"], errors="ignore"), use_container_width=True, hide_index=True)
+        st.caption(f"{len(view.df)} reservations loaded")
+        if view.has_more and st.button("Load more"):
+            view.load_more()
+            st.rerun()
+
+        # After the visit: mark reservations completed or no-show (feeds the no-show rate)
+        col_id, col_new_status, col_update = st.columns([2, 2, 1])
+        reservation_id = col_id.selectbox("Reservation ID", view.df["ID"].tolist())
+        new_status = col_new_status.selectbox("New status", sorted(STATUSES))
+        if col_update.button("Update status"):
+            result = db.update_reservation_status(reservation_id, new_status)
+            if result["success"]:
+                get_reservation_analytics().add_rows(result["data"])
+                view.reload()
+                st.rerun()
+            else:
+                st.error(f"Could not update reservation: {result['error']}")
     else:
         st.info("No bookings found.")
 
@@ -86,9 +98,197 @@ with tab2:
             with open("temp_admin.pdf", "wb") as f:
                 f.write(uploaded_file.getbuffer())
             
-            with st.spinner("Ingesting PDF to Vector Store..."):
-                success, msg = logic.rag.ingest_pdf("temp_admin.pdf")
+            progress = st.progress(0.0, text="Ingesting PDF to Vector Store...")
+            # Re-uploading the same file name replaces that document only
+            success, msg = logic.rag.ingest_pdf(
+                "temp_admin.pdf",
+                doc_id=uploaded_file.name,
+                progress_callback=lambda fraction, text: progress.progress(fraction, text=text)
+            )
+            if success:
+                st.success(f"Success! {msg}")
+            else:
+                st.error(f"Failed: {msg}")
+
+    st.write("---")
+    st.subheader("Documents in Knowledge Base")
+    documents = logic.rag.list_documents()
+    if documents:
+        for doc in documents:
+            col_name, col_chunks, col_action = st.columns([4, 1, 1])
+            col_name.write(f"📄 {doc['source']}")
+            col_chunks.write(f"{doc['chunks']} chunks")
+            if col_action.button("Delete", key=f"delete_doc_{doc['doc_id']}"):
+                success, msg = logic.rag.delete_document(doc["doc_id"])
                 if success:
-                    st.success(f"Success! {msg}")
+                    st.success(msg)
+                    st.rerun()
                 else:
                     st.error(f"Failed: {msg}")
+    else:
+        st.info("No documents ingested yet.")
+
+    st.write("---")
+    st.subheader("Answer Cache")
+    cache_stats = logic.answer_cache.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hits", cache_stats["hits"])
+    c2.metric("Misses", cache_stats["misses"])
+    c3.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+    c4.metric("Cached Answers", cache_stats["entries"])
+    if logic.context_stats["requests"]:
+        st.caption(
+            f"Prompt context: {logic.context_stats['tokens_saved']} of {logic.context_stats['tokens_in']} "
+            f"retrieved tokens saved over {logic.context_stats['requests']} questions"
+        )
+    st.caption(
+        f"Menu index: {len(logic.rag.menu.items)} items, "
+        f"{logic.context_stats['menu_answers']} questions answered directly"
+    )
+    session_stats = logic.sessions.stats()
+    st.caption(
+        f"Chat sessions ({session_stats['backend']}): {session_stats['entries']} active, "
+        f"{session_stats['bytes'] / 1024:.1f} KB, {session_stats['expirations']} expired, "
+        f"{session_stats['evictions']} evicted"
+    )
+    db_timings = db.timings()
+    if db_timings["methods"]:
+        st.caption(
+            "Supabase: " + ", ".join(
+                f"{name} {t['calls']}x p50 {t['p50_ms']:.0f} ms / p95 {t['p95_ms']:.0f} ms"
+                for name, t in db_timings["methods"].items()
+            ) + f"; {db_timings['coalesced']} duplicate reads coalesced"
+        )
+    timings = logic.get_startup_timings()
+    st.caption(
+        "Cold start: " + ", ".join(f"{name.replace('_ms', '')} {value:.0f} ms" for name, value in timings.items())
+    )
+    emb_stats = logic.rag.embeddings.stats()
+    st.caption(
+        f"Embedding cache ({emb_stats['model']}): {emb_stats['entries']}/{emb_stats['max_entries']} vectors, "
+        f"{emb_stats['hit_rate']:.0%} hit rate"
+    )
+    if st.button("Clear Answer Cache"):
+        logic.answer_cache.clear()
+        st.rerun()
+
+with tab3:
+    st.subheader("Bulk Import")
+    st.info("CSV or Parquet with columns: name, email, phone, date, time, party_size, special_requests, status. "
+            "Re-importing the same file, or an export from this page, does not create duplicates.")
+    import_file = st.file_uploader("Reservations file", type=["csv", "parquet"], key="bulk_import_file")
+    dry_run = st.checkbox("Validate only (dry run)")
+    if import_file and st.button("Import"):
+        fmt = "parquet" if import_file.name.lower().endswith(".parquet") else "csv"
+        progress = st.empty()
+        with st.spinner("Importing..."):
+            report = import_bookings(
+                db, import_file, fmt, dry_run=dry_run,
+                progress_callback=lambda rows, done: progress.caption(f"{done} of {rows} rows written...")
+            )
+        verb = "validated" if dry_run else "imported"
+        st.success(
+            f"{report['imported']} of {report['rows']} rows {verb} in {report['seconds']:.1f}s "
+            f"({report['rows_per_sec']:.0f} rows/sec)"
+        )
+        if report["duplicates"]:
+            st.info(f"{report['duplicates']} rows were already imported and were skipped")
+        if report["errors"]:
+            import pandas as pd
+            st.warning(f"{len(report['errors'])} rows rejected")
+            st.dataframe(pd.DataFrame(report["errors"], columns=["Line", "Error"]), hide_index=True)
+
+    st.write("---")
+    st.subheader("Bulk Export")
+    col_from, col_to, col_fmt = st.columns(3)
+    export_from = col_from.date_input("From", value=None, key="export_from")
+    export_to = col_to.date_input("To", value=None, key="export_to")
+    export_fmt = col_fmt.selectbox("Format", ["csv", "parquet"])
+    if st.button("Prepare Export"):
+        import io
+        buffer = io.BytesIO()
+        with st.spinner("Exporting..."):
+            report = export_bookings(
+                db, buffer, export_fmt,
+                from_date=export_from.isoformat() if export_from else None,
+                to_date=export_to.isoformat() if export_to else None
+            )
+        st.caption(f"{report['rows']} rows in {report['seconds']:.1f}s ({report['rows_per_sec']:.0f} rows/sec)")
+        st.download_button("Download", buffer.getvalue(), file_name=f"reservations.{export_fmt}")
+
+with tab4:
+    st.subheader("Reservation Analytics")
+    analytics = get_reservation_analytics()
+    # Aggregates are shared by all admins; only new reservations are fetched
+    analytics.refresh(db, min_interval=Config.ANALYTICS_REFRESH_SECONDS)
+
+    import datetime
+    window = st.selectbox("Period", ["Last 30 days", "Last 90 days", "Last 365 days", "Next 30 days", "All time"])
+    today = datetime.date.today()
+    from_date, to_date = {
+        "Last 30 days": (today - datetime.timedelta(days=30), today),
+        "Last 90 days": (today - datetime.timedelta(days=90), today),
+        "Last 365 days": (today - datetime.timedelta(days=365), today),
+        "Next 30 days": (today, today + datetime.timedelta(days=30)),
+        "All time": (None, None),
+    }[window]
+    from_date = from_date.isoformat() if from_date else None
+    to_date = to_date.isoformat() if to_date else None
+
+    summary = analytics.summary(from_date, to_date)
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Bookings", summary["bookings"])
+    c2.metric("Covers", summary["covers"])
+    c3.metric("Avg Party Size", f"{summary['avg_party_size']:.1f}")
+    c4.metric("No-show Rate", f"{summary['no_show_rate']:.0%}" if summary["no_show_rate"] is not None else "—")
+
+    st.write("**Covers per night**")
+    st.line_chart(analytics.covers_per_night(from_date, to_date))
+    col_left, col_right = st.columns(2)
+    with col_left:
+        st.write("**Peak hours** (covers by start time)")
+        st.bar_chart(analytics.peak_hours(from_date, to_date))
+    with col_right:
+        st.write("**Party sizes**")
+        st.bar_chart(analytics.party_size_histogram())
+    st.write("**Most frequent guests**")
+    st.dataframe(analytics.top_customers(), hide_index=True)
+
+    if st.button("Rebuild Analytics"):
+        # Full reload also picks up edits to existing reservations (e.g. status changes)
+        analytics.rebuild(db)
+        st.rerun()
+
+with tab5:
+    st.subheader("Per-stage Latency")
+    tracer = get_tracer()
+    stages = tracer.stage_stats()
+    if not stages:
+        st.info("No traced turns yet. Send a few chat messages first.")
+    else:
+        import pandas as pd
+        rows = []
+        for name, t in sorted(stages.items()):
+            rows.append({
+                "Stage": name,
+                "Calls": t["count"],
+                "Errors": t["errors"],
+                "p50 (ms)": round(t["p50_ms"], 1),
+                "p95 (ms)": round(t["p95_ms"], 1),
+                "p99 (ms)": round(t["p99_ms"], 1),
+                "Max (ms)": round(t["max_ms"], 1),
+                "Cache Hit Rate": f"{t['cache_hit_rate']:.0%}" if "cache_hit_rate" in t else "",
+                "Tokens": " / ".join(f"{key.replace('_tokens', '')} {value}" for key, value in t.items() if key.endswith("_tokens")),
+            })
+        perf = pd.DataFrame(rows)
+        st.dataframe(perf, hide_index=True, use_container_width=True)
+        st.write("**p95 by stage (ms)**")
+        st.bar_chart(perf.set_index("Stage")["p95 (ms)"])
+    st.caption(
+        f"Percentiles over the last {Config.TRACE_WINDOW} spans per stage. "
+        + (f"Traces exported to: {Config.TRACE_EXPORTER} ({Config.TRACE_FILE})."
+           if Config.TRACE_EXPORTER != "none" else "Set TRACE_EXPORTER=jsonl or console to export traces.")
+    )
+    if st.button("Reset Latency Stats"):
+        tracer.reset()
+        st.rerun()
@@ -1,65 +1,552 @@
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings # Updated import
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
 import os
 import sys
+import threading
+import time
+
+import faiss
+import numpy as np
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from config.config import Config
+from menu_index import MenuIndex, MenuParser
+from models.embeddings import CachedEmbeddings
+from utils.context_assembler import assemble_context
+from utils.tracing import get_tracer
+from utils.hybrid_search import BM25Index, CrossEncoderReranker, reciprocal_rank_fusion
+from utils.faiss_index import (
+    INDEX_TYPES, build_index, index_type_of, min_training_size,
+    rebuild_without, set_search_params, supports_compacting_removal
+)
+
+# Menu items parsed from Config.MENU_TEXT_PATH (never written to disk)
+BUNDLED_MENU_ID = "_bundled_menu"
 
 class RAGPipeline:
-    def __init__(self):
-        # Using free local embeddings
-        print("Loading HuggingFace Embeddings...")
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    def __init__(self, embeddings=None):
+        # Using free local embeddings, cached on disk by content hash so
+        # re-ingesting unchanged chunks and repeated queries skip the model
+        self.embeddings = embeddings or CachedEmbeddings(
+            model_name=Config.EMBEDDING_MODEL,
+            cache_dir=Config.EMBEDDING_CACHE_DIR,
+            max_entries=Config.EMBEDDING_CACHE_MAX_ENTRIES,
+            encode_kwargs={"batch_size": Config.EMBED_BATCH_SIZE}
+        )
         self.index_path = "faiss_index"
+        self.manifest_path = os.path.join(self.index_path, "manifest.json")
         self.vector_store = None
+        # doc_id -> {"source", "chunks": [chunk ids], "ingested_at"}
+        self.manifest = {}
+        # Configured index type; the built index and its training size are in index_info
+        self.index_type = Config.FAISS_INDEX_TYPE.lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"FAISS_INDEX_TYPE must be one of {', '.join(INDEX_TYPES)}")
+        self.index_params = Config.faiss_params()
+        self.index_info = {"type": "flat", "trained_on": 0}
+        # Guards the vector store and manifest against concurrent ingest/query
+        self._index_lock = threading.RLock()
+        # Only one ingest/delete at a time; queries keep running meanwhile
+        self._ingest_lock = threading.Lock()
+        # Small LRU so one chat turn (intent + retrieval) embeds the text once
+        self._query_vectors = OrderedDict()
+        self._query_vectors_lock = threading.Lock()
+        # Callbacks run whenever the index is rebuilt (e.g. to drop cached answers)
+        self._index_listeners = []
+        self._index_mmapped = False
+        self.startup_timings = {}
+        # Structured menu items extracted at ingest, for direct answers
+        self.menu = MenuIndex(os.path.join(self.index_path, "menu.json"))
+        if not self.menu.items and os.path.exists(Config.MENU_TEXT_PATH):
+            # Until a menu PDF is ingested, answer from the bundled menu text
+            with open(Config.MENU_TEXT_PATH) as f:
+                bundled = MenuParser(BUNDLED_MENU_ID).feed(f.read()).items
+            self.menu.replace_document(BUNDLED_MENU_ID, bundled, persist=False)
+        # Keyword index kept in step with the vector store for hybrid retrieval
+        self.bm25 = BM25Index()
+        self.reranker = CrossEncoderReranker(Config.RERANKER_MODEL) if Config.RERANKER_MODEL else None
+        # Per-stage latency of the most recent retrievals, for budgeting the reranker
+        self.stage_ms = {}
+        self._rerank_skips = 0
         self._load_index()
 
     def _load_index(self):
-        if os.path.exists(self.index_path):
-             try:
-                self.vector_store = FAISS.load_local(self.index_path, self.embeddings, allow_dangerous_deserialization=True)
+        start = time.perf_counter()
+        faiss_path = os.path.join(self.index_path, "index.faiss")
+        docstore_path = os.path.join(self.index_path, "docstore.json")
+        legacy_path = os.path.join(self.index_path, "index.pkl")
+        try:
+            if os.path.exists(faiss_path) and os.path.exists(docstore_path):
+                # Memory-map the vectors where the index type allows it
+                index = self._read_faiss(faiss_path, mmap=True)
+                with open(docstore_path) as f:
+                    saved = json.load(f)
+                docstore = InMemoryDocstore({
+                    chunk_id: Document(page_content=doc["page_content"], metadata=doc["metadata"])
+                    for chunk_id, doc in saved["documents"].items()
+                })
+                self.vector_store = FAISS(self.embeddings, index, docstore, dict(enumerate(saved["ids"])))
+                set_search_params(self.vector_store.index, self.index_params)
                 print("Loaded vector store from disk.")
-             except Exception as e:
-                print(f"Failed to load index: {e}")
+            elif os.path.exists(faiss_path) and os.path.exists(legacy_path):
+                # One-time migration of the old pickled docstore to JSON
+                self.vector_store = FAISS.load_local(self.index_path, self.embeddings, allow_dangerous_deserialization=True)
+                self._index_mmapped = False
+                self._load_manifest()
+                self._save()
+                os.remove(legacy_path)
+                print("Migrated pickled vector store to JSON docstore.")
+        except Exception as e:
+            print(f"Failed to load index: {e}")
+        self._load_manifest()
+        self._rebuild_bm25()
+        self.startup_timings["index_load_ms"] = (time.perf_counter() - start) * 1000
+
+    def _rebuild_bm25(self):
+        bm25 = BM25Index()
+        if self.vector_store is not None:
+            for chunk_id in self.vector_store.index_to_docstore_id.values():
+                bm25.add(chunk_id, self.vector_store.docstore.search(chunk_id).page_content)
+        self.bm25 = bm25
+
+    def _read_faiss(self, path, mmap=False):
+        if mmap and hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            try:
+                index = faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC)
+                self._index_mmapped = True
+                return index
+            except Exception:
+                pass
+        self._index_mmapped = False
+        return faiss.read_index(path)
+
+    def _ensure_writable(self):
+        """
+        A memory-mapped index can be searched but not modified; load a private
+        copy before the first mutation. Caller holds _index_lock.
+        """
+        if self._index_mmapped and self.vector_store is not None:
+            self.vector_store.index = self._read_faiss(os.path.join(self.index_path, "index.faiss"))
+            set_search_params(self.vector_store.index, self.index_params)
+        self._index_mmapped = False
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                saved = json.load(f)
+            self.manifest = saved["documents"]
+            self.index_info = saved.get("index", self.index_info)
+        elif self.vector_store is not None:
+            # Index built before per-document tracking: keep it as one document
+            self.manifest = {
+                "legacy": {
+                    "source": "Existing knowledge base",
+                    "chunks": list(self.vector_store.index_to_docstore_id.values()),
+                    "ingested_at": None,
+                }
+            }
+
+    def _write_atomic(self, path, write):
+        tmp_path = path + ".tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _save(self):
+        """Persist as index.faiss + docstore.json (no pickle) plus the manifest."""
+        os.makedirs(self.index_path, exist_ok=True)
+        if self.vector_store is not None:
+            store = self.vector_store
+            ids = [store.index_to_docstore_id[i] for i in range(len(store.index_to_docstore_id))]
+            documents = {}
+            for chunk_id in ids:
+                doc = store.docstore.search(chunk_id)
+                documents[chunk_id] = {"page_content": doc.page_content, "metadata": doc.metadata}
+
+            def write_docstore(path):
+                with open(path, "w") as f:
+                    json.dump({"ids": ids, "documents": documents}, f)
+
+            self._write_atomic(os.path.join(self.index_path, "index.faiss"), lambda path: faiss.write_index(store.index, path))
+            self._write_atomic(os.path.join(self.index_path, "docstore.json"), write_docstore)
+
+        def write_manifest(path):
+            with open(path, "w") as f:
+                json.dump({"documents": self.manifest, "index": self.index_info}, f, indent=2)
+
+        self._write_atomic(self.manifest_path, write_manifest)
+
+    def _stored_vectors(self):
+        """Exact vectors for every indexed chunk, in index order (served from the embedding cache)."""
+        store = self.vector_store
+        ids = [store.index_to_docstore_id[i] for i in range(len(store.index_to_docstore_id))]
+        texts = [store.docstore.search(doc_id).page_content for doc_id in ids]
+        if not texts:
+            return np.zeros((0, store.index.d), dtype=np.float32)
+        return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+
+    def _ensure_index_type(self):
+        """
+        Convert the index to the configured type, training it once there is
+        enough data, and retrain IVF/PQ when the corpus has grown 4x since.
+        Caller holds _index_lock.
+        """
+        store = self.vector_store
+        if store is None:
+            return
+        count = store.index.ntotal
+        wanted = self.index_type
+        if count < min_training_size(wanted, self.index_params):
+            wanted = "flat"
+
+        current = index_type_of(store.index)
+        grown = wanted in ("ivf", "pq") and count > 4 * max(self.index_info.get("trained_on", 0), 1)
+        if current != wanted or grown:
+            print(f"Building {wanted} index over {count} vectors...")
+            store.index = build_index(wanted, self._stored_vectors(), self.index_params)
+            self.index_info = {"type": wanted, "trained_on": count}
+
+    def _delete_chunks(self, chunk_ids):
+        """Remove chunks from the store. Caller holds _index_lock."""
+        self._ensure_writable()
+        store = self.vector_store
+        for chunk_id in chunk_ids:
+            self.bm25.remove(chunk_id)
+        if supports_compacting_removal(store.index):
+            store.delete(chunk_ids)
+            return
+        # IVF/HNSW: rebuild without the removed positions, then renumber
+        to_remove = set(chunk_ids)
+        positions = {pos for pos, cid in store.index_to_docstore_id.items() if cid in to_remove}
+        store.index = rebuild_without(store.index, positions, self.index_params)
+        store.docstore.delete([store.index_to_docstore_id[pos] for pos in positions])
+        remaining = [cid for pos, cid in sorted(store.index_to_docstore_id.items()) if pos not in positions]
+        store.index_to_docstore_id = dict(enumerate(remaining))
+
+    def warm_up(self):
+        """Load the embedding model and touch the index so the first query is fast."""
+        start = time.perf_counter()
+        self.embeddings.model
+        with self._index_lock:
+            if self.vector_store is not None and self.vector_store.index.ntotal:
+                self.vector_store.index.search(np.zeros((1, self.vector_store.index.d), dtype=np.float32), 1)
+        self.startup_timings["warm_up_ms"] = (time.perf_counter() - start) * 1000
+
+    def add_index_listener(self, callback):
+        """Register a callback to run after the index changes."""
+        self._index_listeners.append(callback)
+
+    def _notify_index_changed(self):
+        for callback in self._index_listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Index listener failed: {e}")
+
+    @staticmethod
+    def _chunk_id(doc_id, text):
+        # Content hash, so an unchanged chunk keeps its id across re-ingests
+        return f"{doc_id}:{hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]}"
+
+    def list_documents(self):
+        """Documents in the knowledge base with their chunk counts."""
+        with self._index_lock:
+            return [
+                {"doc_id": doc_id, "source": info["source"], "chunks": len(info["chunks"]), "ingested_at": info["ingested_at"]}
+                for doc_id, info in self.manifest.items()
+            ]
+
+    def _count_pages(self, pdf_path):
+        try:
+            from pypdf import PdfReader
+            return len(PdfReader(pdf_path).pages)
+        except Exception:
+            return None
+
+    def _embed_batch(self, batch):
+        """Embed a list of (chunk_id, chunk) pairs; runs on the worker pool."""
+        texts = [chunk.page_content for _, chunk in batch]
+        return batch, self.embeddings.embed_documents(texts)
+
+    def _add_batch(self, batch, vectors):
+        ids = [cid for cid, _ in batch]
+        text_embeddings = list(zip([chunk.page_content for _, chunk in batch], vectors))
+        metadatas = [chunk.metadata for _, chunk in batch]
+        with self._index_lock:
+            self._ensure_writable()
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+            else:
+                self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+            for chunk_id, (text, _) in zip(ids, text_embeddings):
+                self.bm25.add(chunk_id, text)
 
-    def ingest_pdf(self, pdf_path):
+    def ingest_pdf(self, pdf_path, doc_id=None, progress_callback=None):
         """
-        Ingest a PDF file, split into chunks, and create a vector store.
+        Ingest a PDF file incrementally.
+        Chunks are content-hashed; only new or changed chunks are embedded, and
+        chunks that disappeared from this document are removed. Other documents
+        in the index are left untouched. `doc_id` defaults to the file name.
+
+        Pages are read lazily and new chunks are embedded in batches of
+        Config.EMBED_BATCH_SIZE on Config.EMBED_WORKERS threads, with a bounded
+        number of batches in flight. `progress_callback(fraction, message)` is
+        called from the calling thread as pages are processed.
         """
+        doc_id = doc_id or os.path.basename(pdf_path)
+        batch_size = Config.EMBED_BATCH_SIZE
+        workers = Config.EMBED_WORKERS
+
+        def report(fraction, message):
+            if progress_callback:
+                progress_callback(min(fraction, 1.0), message)
+
         try:
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
-            
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
+            with self._ingest_lock:
+                loader = PyPDFLoader(pdf_path)
+                total_pages = self._count_pages(pdf_path)
+                text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=1000,
+                    chunk_overlap=200
+                )
+
+                with self._index_lock:
+                    self._ensure_writable()
+                    old_ids = set(self.manifest.get(doc_id, {}).get("chunks", []))
+
+                chunk_ids = {}  # ordered set of this document's chunk ids
+                menu_parser = MenuParser(doc_id)
+                # Embedded batches are held here and only added to the live
+                # index in one locked step at the end, so a failure partway
+                # through leaves the index as it was
+                staged = []
+                pending = []
+                in_flight = deque()
+
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    for page_number, page in enumerate(loader.lazy_load(), start=1):
+                        menu_parser.feed(page.page_content)
+                        for chunk in text_splitter.split_documents([page]):
+                            # Deduplicate by content hash
+                            chunk_id = self._chunk_id(doc_id, chunk.page_content)
+                            if chunk_id in chunk_ids:
+                                continue
+                            chunk_ids[chunk_id] = None
+                            if chunk_id in old_ids:
+                                continue
+                            chunk.metadata["doc_id"] = doc_id
+                            pending.append((chunk_id, chunk))
+                            if len(pending) >= batch_size:
+                                in_flight.append(pool.submit(self._embed_batch, pending))
+                                pending = []
+
+                        # Keep memory bounded: wait for the oldest batches to finish
+                        while len(in_flight) > workers * 2:
+                            staged.append(in_flight.popleft().result())
+
+                        if total_pages:
+                            report(0.9 * page_number / total_pages, f"Processed page {page_number} of {total_pages}")
+                        else:
+                            report(0.0, f"Processed page {page_number}")
+
+                    if pending:
+                        in_flight.append(pool.submit(self._embed_batch, pending))
+                    while in_flight:
+                        staged.append(in_flight.popleft().result())
+
+                report(0.95, "Saving index...")
+                added = sum(len(batch) for batch, _ in staged)
+                with self._index_lock:
+                    added_ids = []
+                    try:
+                        for batch, vectors in staged:
+                            self._add_batch(batch, vectors)
+                            added_ids.extend(cid for cid, _ in batch)
+                    except Exception:
+                        if added_ids:
+                            self._delete_chunks(added_ids)
+                        raise
+                    removed = [cid for cid in old_ids if cid not in chunk_ids]
+                    if removed:
+                        self._delete_chunks(removed)
+                    self._ensure_index_type()
+
+                    self.manifest[doc_id] = {
+                        "source": doc_id,
+                        "chunks": list(chunk_ids),
+                        "ingested_at": time.time(),
+                    }
+                    # Save to disk
+                    self._save()
+
+                self.menu.replace_document(doc_id, menu_parser.items)
+                if menu_parser.items:
+                    self.menu.remove_document(BUNDLED_MENU_ID)
+
+            if added or removed:
+                self._notify_index_changed()
+            report(1.0, "Done")
+            unchanged = len(chunk_ids) - added
+            return True, (
+                f"{doc_id}: embedded {added} new chunks, removed {len(removed)}, kept {unchanged} unchanged; "
+                f"{len(menu_parser.items)} menu items."
             )
-            chunks = text_splitter.split_documents(documents)
-            
-            # Create Vector Store
-            self.vector_store = FAISS.from_documents(chunks, self.embeddings)
-            # Save to disk
-            self.vector_store.save_local(self.index_path)
-            return True, f"Processed {len(chunks)} chunks and saved index."
         except Exception as e:
             return False, str(e)
 
-    def query(self, query_text):
+    def delete_document(self, doc_id):
+        """Remove one document's vectors from the index."""
+        try:
+            with self._ingest_lock, self._index_lock:
+                if doc_id not in self.manifest:
+                    return False, f"Unknown document: {doc_id}"
+                self._ensure_writable()
+                chunk_ids = self.manifest.pop(doc_id)["chunks"]
+                if chunk_ids:
+                    self._delete_chunks(chunk_ids)
+                    self._ensure_index_type()
+                self._save()
+                self.menu.remove_document(doc_id)
+            self._notify_index_changed()
+            return True, f"Removed {doc_id} ({len(chunk_ids)} chunks)."
+        except Exception as e:
+            return False, str(e)
+
+    def embed_query(self, text, max_cached=256):
         """
-        Retrieve relevant context for a query.
+        Embed a query string, reusing recent results.
+        """
+        with get_tracer().span("rag.embed_query") as span:
+            with self._query_vectors_lock:
+                if text in self._query_vectors:
+                    self._query_vectors.move_to_end(text)
+                    span.set("cache_hit", True)
+                    return self._query_vectors[text]
+
+            span.set("cache_hit", False)
+            vector = self.embeddings.embed_query(text)
+
+            with self._query_vectors_lock:
+                self._query_vectors[text] = vector
+                while len(self._query_vectors) > max_cached:
+                    self._query_vectors.popitem(last=False)
+            return vector
+
+    def _record_stage(self, name, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        budget = Config.RETRIEVAL_STAGE_BUDGETS_MS.get(name)
+        if budget is not None and elapsed > budget:
+            print(f"Retrieval stage '{name}' took {elapsed:.1f} ms (budget {budget} ms)")
+        # Exponential moving average, used to predict whether a stage fits the budget
+        previous = self.stage_ms.get(name)
+        self.stage_ms[name] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+        return elapsed
+
+    def _should_rerank(self, elapsed_ms):
+        if self.reranker is None:
+            return False
+        expected = self.stage_ms.get("rerank", 0.0)
+        if elapsed_ms + expected <= Config.RETRIEVAL_BUDGET_MS:
+            self._rerank_skips = 0
+            return True
+        # Re-measure now and then in case the reranker got faster (e.g. after warm-up)
+        self._rerank_skips += 1
+        return self._rerank_skips % 50 == 0
+
+    def retrieve(self, query_text, k=3):
+        """
+        Hybrid retrieval: FAISS vector search and BM25 keyword search, merged
+        with reciprocal-rank fusion, then optionally reordered by a cross-encoder
+        if it fits in the latency budget. Returns up to k Documents.
+        """
+        if not self.vector_store:
+            return []
+
+        started = time.perf_counter()
+        query_vector = self.embed_query(query_text)
+        self._record_stage("embed", started)
+        candidates = max(k, Config.RETRIEVAL_CANDIDATES)
+
+        tracer = get_tracer()
+        with self._index_lock:
+            store = self.vector_store
+            stage_start = time.perf_counter()
+            with tracer.span("rag.vector_search", candidates=candidates) as span:
+                _, positions = store.index.search(np.asarray([query_vector], dtype=np.float32), candidates)
+                vector_ids = [store.index_to_docstore_id[p] for p in positions[0] if p != -1]
+                span.set("hits", len(vector_ids))
+            self._record_stage("vector", stage_start)
+
+            if Config.RETRIEVAL_MODE == "hybrid":
+                stage_start = time.perf_counter()
+                with tracer.span("rag.bm25", candidates=candidates) as span:
+                    keyword_ids = [doc_id for doc_id, _ in self.bm25.search(query_text, candidates)]
+                    span.set("hits", len(keyword_ids))
+                self._record_stage("bm25", stage_start)
+                ranked_ids = reciprocal_rank_fusion([vector_ids, keyword_ids], k=Config.RRF_K)
+            else:
+                ranked_ids = vector_ids
+
+            docs = [store.docstore.search(doc_id) for doc_id in ranked_ids[:max(k, Config.RERANK_TOP_N)]]
+
+        elapsed = (time.perf_counter() - started) * 1000
+        if len(docs) > 1 and self._should_rerank(elapsed):
+            stage_start = time.perf_counter()
+            with tracer.span("rag.rerank", docs=len(docs)):
+                try:
+                    pairs = self.reranker.rerank(query_text, [(doc, doc.page_content) for doc in docs])
+                    docs = [doc for doc, _ in pairs]
+                except Exception as e:
+                    print(f"Reranker failed: {e}")
+            self._record_stage("rerank", stage_start)
+
+        return docs[:k]
+
+    def query_with_stats(self, query_text):
+        """
+        Retrieve relevant context for a query, merged, deduplicated and fitted
+        to Config.CONTEXT_TOKEN_BUDGET. Returns (context, stats).
         """
         if not self.vector_store:
             # Try to load again just in case
             self._load_index()
             
-        if not self.vector_store:
-            return "No documents processed yet."
+        # Deleting every document leaves an empty store rather than none
+        if not self.vector_store or not self.manifest or not self.vector_store.index.ntotal:
+            return "No documents processed yet.", {}
         
-        # Retrieve top 3 chunks
-        docs = self.vector_store.similarity_search(query_text, k=3)
-        context = "\n\n".join([doc.page_content for doc in docs])
+        with get_tracer().span("rag.query", mode=Config.RETRIEVAL_MODE) as span:
+            docs = self.retrieve(query_text, k=Config.RETRIEVAL_TOP_K)
+            context, stats = assemble_context(docs, Config.CONTEXT_TOKEN_BUDGET)
+            span.set("candidate_chunks", stats.get("chunks_in"))
+            span.set("chunks", stats.get("chunks_out"))
+            span.set("context_tokens", stats.get("tokens_out"))
+            span.set("saved_tokens", stats.get("tokens_saved"))
+        return context, stats
+
+    def query(self, query_text):
+        """
+        Retrieve relevant context for a query.
+        """
+        context, _ = self.query_with_stats(query_text)
         return context
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_rag_pipeline():
+    """Process-wide RAGPipeline, created on first use."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = RAGPipeline()
+    return _pipeline
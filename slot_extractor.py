@@ -0,0 +1,250 @@
+import datetime
+import re
+
+EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]*[a-zA-Z0-9]")
+# 7+ digits with optional +, spaces, dashes, dots and parentheses
+PHONE_RE = re.compile(r"(?<![\w-])\+?\(?\d[\d\s().-]{5,}\d(?![\w-])")
+TIME_RE = re.compile(
+    r"\b(?:at\s+)?(?P<hour>[01]?\d|2[0-3])(?::(?P<minute>[0-5]\d))?\s*(?P<ampm>[ap]\.?m\.?)(?!\w)"
+    r"|\bat\s+(?P<hour24>[01]?\d|2[0-3]):(?P<minute24>[0-5]\d)\b"
+    r"|\b(?P<hhmm_hour>[01]?\d|2[0-3]):(?P<hhmm_minute>[0-5]\d)\b",
+    re.IGNORECASE,
+)
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "a couple": 2, "couple": 2,
+}
+_NUMBER = r"(\d{1,2}|" + "|".join(NUMBER_WORDS) + r")"
+PARTY_RE = re.compile(
+    r"\b(?:table|party|booking|reservation|group)\s+(?:for|of)\s+" + _NUMBER + r"\b"
+    r"|\bfor\s+" + _NUMBER + r"\s*(?:people|persons|guests|adults|pax|of us)?\b(?!\s*(?:[ap]\.?m|:|o'clock))"
+    r"|\b" + _NUMBER + r"\s+(?:people|persons|guests|adults|pax|of us)\b",
+    re.IGNORECASE,
+)
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+_MONTH = r"(?:" + "|".join(m[:3] + r"(?:" + m[3:] + r")?" for m in MONTHS) + r")\.?"
+DATE_RE = re.compile(
+    r"\b(?:today|tonight|tomorrow|day after tomorrow)\b"
+    r"|\b(?:(?:this|next|on)\s+)?(?:" + "|".join(WEEKDAYS) + r")\b"
+    r"|\b\d{4}-\d{1,2}-\d{1,2}\b"
+    r"|\b\d{1,2}[/.]\d{1,2}(?:[/.]\d{2,4})?\b"
+    r"|\b\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH + r"(?:\s+\d{4})?"
+    r"|\b" + _MONTH + r"\s+\d{1,2}(?:st|nd|rd|th)?\b(?:,?\s+\d{4})?"
+    r"|\b(?:on\s+)?the\s+\d{1,2}(?:st|nd|rd|th)\b",
+    re.IGNORECASE,
+)
+# The lead-in is matched in any case; the name itself must be capitalised
+NAME_RE = re.compile(
+    r"\b(?i:my name is|name is|name's|this is|i am|i'm|under(?: the name)?|name:)\s+"
+    r"(?P<name>[A-Z][\w'-]+(?:\s+[A-Z][\w'-]+){0,2})"
+)
+# Wording that explicitly corrects a detail given earlier
+CHANGE_RE = re.compile(r"\b(?:change|actually|instead|make it|correction|update)\b", re.IGNORECASE)
+REQUESTS_RE = re.compile(r"\b(?:special requests?|requests?|note)\s*[:\-]\s*(?P<requests>.+)$", re.IGNORECASE)
+
+# Capitalised words that are not names when they stand alone in a message
+NOT_NAMES = {
+    "hi", "hello", "hey", "thanks", "thank", "please", "yes", "no", "ok", "okay", "table", "book",
+    "booking", "reservation", "reserve", "tomorrow", "today", "tonight", "i", "we", "dinner", "lunch",
+    "great", "sure", "none", "nope", "yeah", "yep", "yup", "fine", "good", "perfect", "cool", "awesome",
+    "sounds", "correct", "confirm", "cancel", "nothing", "nah", "done",
+    "night", "evening", "morning", "afternoon", "noon", "midnight", "weekend", "week", "next", "this",
+    "window", "seat", "booth", "patio", "terrace", "outside", "inside", "bar", "quiet", "corner",
+    "birthday", "anniversary", "vegan", "vegetarian", "allergy", "allergies", "high", "chair",
+} | set(WEEKDAYS) | set(MONTHS)
+
+
+def normalize_time(raw, assume_pm=False):
+    """
+    '7pm', '7:30 pm', '19:00' -> 'HH:MM:SS', or None.
+    With assume_pm, a 24-hour-style time before noon without am/pm ('7:30')
+    is read as evening, since we only take dinner bookings.
+    """
+    match = TIME_RE.search(raw)
+    if not match:
+        return None
+    if match.group("hour") is not None:
+        hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+        pm = match.group("ampm").lower().startswith("p")
+        if hour > 12:
+            return None
+        hour = hour % 12 + (12 if pm else 0)
+    elif match.group("hour24") is not None:
+        hour, minute = int(match.group("hour24")), int(match.group("minute24"))
+    else:
+        hour, minute = int(match.group("hhmm_hour")), int(match.group("hhmm_minute"))
+    if assume_pm and match.group("hour") is None and 1 <= hour < 12:
+        hour += 12
+    return datetime.time(hour, minute).strftime("%H:%M:%S")
+
+
+def _month_number(word):
+    word = word.lower().rstrip(".")
+    return next((i for i, month in enumerate(MONTHS, start=1) if month.startswith(word[:3])), None)
+
+
+def _upcoming(day, month, today):
+    """The next occurrence of day/month on or after today."""
+    for year in (today.year, today.year + 1):
+        try:
+            candidate = datetime.date(year, month, day)
+        except ValueError:
+            continue
+        if candidate >= today:
+            return candidate
+    return None
+
+
+def normalize_date(raw, today=None):
+    """
+    Resolve a date phrase ('tomorrow', 'next friday', 'May 20th', '20/05',
+    '2026-05-20') to a datetime.date. Returns None if it can't be read.
+    Dates without a year mean the next such date; an ambiguous numeric date
+    takes the reading that comes up first (month/day first when a year is given).
+    """
+    today = today or datetime.date.today()
+    text = raw.lower().strip()
+    if re.search(r"\bday after tomorrow\b", text):
+        return today + datetime.timedelta(days=2)
+    if re.search(r"\btomorrow\b", text):
+        return today + datetime.timedelta(days=1)
+    if re.search(r"\b(today|tonight)\b", text):
+        return today
+
+    for offset_word in ("next", ""):
+        for weekday, name in enumerate(WEEKDAYS):
+            if re.search(r"\b" + name + r"\b", text) and (offset_word in text.split() or not offset_word):
+                days = (weekday - today.weekday()) % 7
+                if days == 0 and offset_word:
+                    days = 7
+                return today + datetime.timedelta(days=days)
+
+    match = re.search(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", text)
+    if match:
+        try:
+            return datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            return None
+
+    match = re.search(r"\b(\d{1,2})[/.](\d{1,2})(?:[/.](\d{2,4}))?\b", text)
+    if match:
+        first, second = int(match.group(1)), int(match.group(2))
+        year = match.group(3)
+        for month, day in ((first, second), (second, first)):
+            if year:
+                try:
+                    return datetime.date(int(year) + (2000 if len(year) == 2 else 0), month, day)
+                except ValueError:
+                    continue
+        # Without a year, take whichever reading comes up first
+        candidates = [_upcoming(day, month, today) for month, day in ((first, second), (second, first)) if 1 <= month <= 12]
+        candidates = [c for c in candidates if c]
+        return min(candidates) if candidates else None
+
+    match = (re.search(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([a-z]{3,9})\.?(?:\s+(\d{4}))?", text)
+             or re.search(r"\b([a-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b(?:,?\s+(\d{4}))?", text))
+    if match:
+        groups = match.groups()
+        day_text, month_text = (groups[0], groups[1]) if groups[0].isdigit() else (groups[1], groups[0])
+        month = _month_number(month_text)
+        if month:
+            if groups[2]:
+                try:
+                    return datetime.date(int(groups[2]), month, int(day_text))
+                except ValueError:
+                    return None
+            return _upcoming(int(day_text), month, today)
+
+    match = re.search(r"\bthe\s+(\d{1,2})(?:st|nd|rd|th)\b", text)
+    if match:
+        day = int(match.group(1))
+        for months_ahead in range(3):
+            month_index = today.month - 1 + months_ahead
+            year, month = today.year + month_index // 12, month_index % 12 + 1
+            try:
+                candidate = datetime.date(year, month, day)
+            except ValueError:
+                continue
+            if candidate >= today:
+                return candidate
+    return None
+
+
+def parse_party_size(raw):
+    match = PARTY_RE.search(raw)
+    if not match:
+        return None
+    value = next(group for group in match.groups() if group)
+    return str(NUMBER_WORDS.get(value.lower(), value))
+
+
+def _name_from_segments(text):
+    """A comma-separated segment that is just one to three capitalised words."""
+    for segment in re.split(r"[,;\n]", text):
+        words = segment.strip(" .!").split()
+        if 1 <= len(words) <= 3 and all(re.fullmatch(r"[A-Z][a-z'-]+", w) for w in words):
+            if not any(w.lower() in NOT_NAMES for w in words):
+                return " ".join(words)
+    return None
+
+
+def is_not_name(text):
+    """True when every word is a greeting, affirmative or date word ("Sure", "Tomorrow Night")."""
+    words = re.findall(r"[a-z']+", text.lower())
+    return not words or all(w in NOT_NAMES for w in words)
+
+
+def extract_slots(text, bare_name=False, guess_name=False):
+    """
+    Pull every booking field we can recognise out of one message.
+    Returns a dict with any of: name, email, phone, date, time, party_size,
+    special_requests. Dates are returned as written ("tomorrow", "May 20").
+    A name is only taken from an explicit "my name is ..." unless `bare_name`
+    (we just asked for it), when a bare capitalised segment also counts. With
+    `guess_name` (no name on file yet), a message that carries other details
+    may give the name as one of its comma-separated parts:
+    "table for 4 tomorrow at 7pm, Jane, jane@x.com".
+    """
+    slots = {}
+    rest = text
+
+    def take(match, key, value):
+        nonlocal rest
+        if value is None:
+            return
+        slots[key] = value
+        rest = rest.replace(match.group(0), " ", 1)
+
+    match = REQUESTS_RE.search(rest)
+    if match:
+        take(match, "special_requests", match.group("requests").strip())
+    match = EMAIL_RE.search(rest)
+    if match:
+        take(match, "email", match.group(0))
+    match = TIME_RE.search(rest)
+    if match:
+        take(match, "time", normalize_time(match.group(0), assume_pm=True))
+    match = DATE_RE.search(rest)
+    if match:
+        take(match, "date", match.group(0).strip())
+    match = PARTY_RE.search(rest)
+    if match:
+        take(match, "party_size", parse_party_size(match.group(0)))
+    match = PHONE_RE.search(rest)
+    if match and len(re.sub(r"\D", "", match.group(0))) >= 7:
+        take(match, "phone", match.group(0).strip())
+
+    match = NAME_RE.search(rest)
+    if match:
+        name = match.group("name")
+    elif bare_name or (guess_name and slots and re.search(r"[,;]", text)):
+        name = _name_from_segments(rest)
+    else:
+        name = None
+    if name and name.split()[0].lower() not in NOT_NAMES:
+        slots["name"] = name
+    return slots
+
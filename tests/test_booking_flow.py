@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from booking_flow import BookingFlow, BookingState
+
+
+def available(date, time, party_size):
+    return None, []
+
+
+def test_name_in_a_message_with_other_details():
+    flow = BookingFlow()
+    reply, _ = flow.process_input("table for 4 tomorrow at 7pm, Jane, jane@x.com", check_availability=available)
+
+    assert flow.booking_data["name"] == "Jane"
+    assert flow.booking_data["email"] == "jane@x.com"
+    # Phone is the only follow-up
+    assert flow.state == BookingState.COLLECT_PHONE
+    assert "Phone Number" in reply
+
+
+def test_guessed_name_does_not_replace_given_name():
+    flow = BookingFlow()
+    flow.process_input("my name is Ann Lee, table for 2 tomorrow at 8pm", check_availability=available)
+    flow.process_input("ann@x.com, Bob", check_availability=available)
+
+    assert flow.booking_data["name"] == "Ann Lee"
@@ -0,0 +1,72 @@
+import io
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db.bulk import export_bookings, import_bookings
+
+
+class FakeDB:
+    """The SupabaseManager calls bulk import/export make, kept in memory."""
+
+    def __init__(self):
+        self.customers = {}  # email -> row
+        self.reservations = []
+        self._ids = itertools.count(1)
+
+    def upsert_customers(self, customers):
+        for c in customers:
+            self.customers.setdefault(c["email"], {"id": next(self._ids)}).update(c)
+        return [{"id": self.customers[c["email"]]["id"], "email": c["email"]} for c in customers]
+
+    def existing_reservation_ids(self, ids):
+        known = {str(r["id"]) for r in self.reservations}
+        return {str(i) for i in ids if str(i) in known}
+
+    def insert_reservations(self, reservations):
+        keys = {r.get("idempotency_key") for r in self.reservations}
+        inserted = []
+        for row in reservations:
+            if row["idempotency_key"] in keys:
+                continue
+            row = dict(row, id=next(self._ids), created_at="2026-01-01T12:00:00")
+            self.reservations.append(row)
+            inserted.append(row)
+        return inserted
+
+    def get_reservations(self, from_date=None, to_date=None, status=None, after=None, limit=100):
+        if after is not None:
+            return []
+        by_id = {c["id"]: c for c in self.customers.values()}
+        rows = []
+        for r in self.reservations:
+            customer = by_id[r["customer_id"]]
+            rows.append(dict(r, customers={"name": customer["name"], "email": customer["email"], "phone": customer["phone"]}))
+        return rows[:limit]
+
+
+def chat_booking(db, name, email, date, time, party_size):
+    # Bookings made in chat carry the session's key, not an import key
+    customer_id = db.upsert_customers([{"name": name, "email": email, "phone": "555-0100"}])[0]["id"]
+    db.reservations.append({
+        "id": next(db._ids), "customer_id": customer_id, "party_size": party_size,
+        "reservation_date": date, "reservation_time": time, "special_requests": "",
+        "status": "confirmed", "idempotency_key": f"chat-{email}", "created_at": "2026-01-01T12:00:00",
+    })
+
+
+def test_reimporting_an_export_imports_nothing():
+    db = FakeDB()
+    chat_booking(db, "Jane Doe", "jane@example.com", "2026-03-12", "19:00:00", 2)
+    chat_booking(db, "Sam Lee", "sam@example.com", "2026-03-13", "20:30:00", 4)
+
+    exported = io.BytesIO()
+    assert export_bookings(db, exported)["rows"] == 2
+
+    report = import_bookings(db, io.BytesIO(exported.getvalue()))
+    assert report["errors"] == []
+    assert report["imported"] == 0
+    assert report["duplicates"] == 2
+    assert len(db.reservations) == 2
+
@@ -0,0 +1,119 @@
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # tiktoken is optional; fall back to the usual ~4 characters per token
+    _encoding = None
+
+# Overlaps shorter than this are treated as coincidence, not splitter overlap
+MIN_OVERLAP_CHARS = 40
+MAX_OVERLAP_CHARS = 400
+# Lines shorter than this (headings, prices) may legitimately repeat
+MIN_DEDUP_LINE_CHARS = 25
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to at most max_tokens, preferring a line or sentence boundary."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        cut = _encoding.decode(_encoding.encode(text)[:max_tokens])
+    else:
+        cut = text[:max_tokens * 4]
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip()
+
+
+def _overlap(left, right):
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_into(pieces, text):
+    """Fold one chunk into the list of merged pieces, joining overlaps and dropping duplicates."""
+    for i, piece in enumerate(pieces):
+        if text in piece:
+            return
+        if piece in text:
+            pieces[i] = text
+            return
+        size = _overlap(piece, text)
+        if size:
+            pieces[i] = piece + text[size:]
+            return
+        size = _overlap(text, piece)
+        if size:
+            pieces[i] = text + piece[size:]
+            return
+    pieces.append(text)
+
+
+def _drop_repeated_lines(pieces):
+    seen = set()
+    result = []
+    for piece in pieces:
+        kept = []
+        for line in piece.split("\n"):
+            key = " ".join(line.split()).lower()
+            if len(key) >= MIN_DEDUP_LINE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(line)
+        text = "\n".join(kept).strip()
+        if text:
+            result.append(text)
+    return result
+
+
+def assemble_context(docs, max_tokens):
+    """
+    Build the prompt context from retrieved documents, most relevant first.
+    Adjacent/overlapping chunks are stitched together, duplicate passages are
+    removed, and the result is cut to fit max_tokens.
+    Returns (context, stats) where stats reports tokens before and after.
+    """
+    texts = [doc.page_content.strip() for doc in docs if doc.page_content.strip()]
+    naive = "\n\n".join(texts)
+    tokens_in = count_tokens(naive)
+
+    # Overlaps are detected in either direction, so relevance order is kept
+    pieces = []
+    for text in texts:
+        _merge_into(pieces, text)
+    pieces = _drop_repeated_lines(pieces)
+
+    selected = []
+    remaining = max_tokens
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if tokens > remaining:
+            piece = truncate_to_tokens(piece, remaining)
+            if piece:
+                selected.append(piece)
+            break
+        selected.append(piece)
+        remaining -= tokens + 1  # separator
+
+    context = "\n\n".join(selected)
+    tokens_out = count_tokens(context)
+    return context, {
+        "chunks_in": len(texts),
+        "chunks_out": len(selected),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": max(tokens_in - tokens_out, 0),
+    }
@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import threading
+import time
+
+from utils.email_sender import send_confirmation_emails
+
+
+class EmailOutbox:
+    """
+    Background worker that delivers confirmation emails off the request path.
+    Runs its own asyncio loop on a daemon thread. Whatever jobs are queued when
+    the worker wakes go out as one batch (`send_batch`, one SMTP connection);
+    failed emails are re-queued with exponential backoff. Callers poll `status(job_id)` or
+    `latest_status(session_id)` for the outcome.
+
+    Jobs live in this process only, so job ids mean nothing to other workers
+    and must not be written to a shared session store.
+    """
+
+    def __init__(self, send_batch=send_confirmation_emails, max_attempts=3, base_delay=2.0, concurrency=4,
+                 retention=3600, max_batch=50):
+        self.send_batch = send_batch  # [(to_email, booking_details)] -> [{"success", "error"}]
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.concurrency = concurrency
+        self.retention = retention  # seconds to keep finished jobs pollable
+        self._jobs = {}  # job_id -> status dict
+        self._latest = {}  # session_id -> newest job_id
+        self._tasks = set()  # in-flight deliveries; the loop only keeps weak references
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._started = threading.Event()
+
+    def _ensure_worker(self):
+        if self._loop is not None:
+            return
+        with self._lock:
+            if self._loop is None:
+                thread = threading.Thread(target=self._run_loop, name="email-outbox", daemon=True)
+                thread.start()
+                self._started.wait()
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._loop = loop
+        loop.create_task(self._worker())
+        self._started.set()
+        loop.run_forever()
+
+    async def _worker(self):
+        while True:
+            # Wait for one job, then take whatever else is already queued
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            task = asyncio.create_task(self._deliver(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, job_ids):
+        async with self._semaphore:
+            with self._lock:
+                for job_id in job_ids:
+                    job = self._jobs[job_id]
+                    job.update(status="sending", attempts=job["attempts"] + 1)
+                emails = [(self._jobs[j]["to_email"], self._jobs[j]["booking_details"]) for j in job_ids]
+            try:
+                results = await asyncio.to_thread(self.send_batch, emails)
+            except Exception as e:
+                results = [{"success": False, "error": str(e)}] * len(job_ids)
+
+        for job_id, result in zip(job_ids, results):
+            if result.get("success"):
+                self._update(job_id, status="sent", error=None, finished_at=time.time())
+                continue
+            attempts = self._jobs[job_id]["attempts"]
+            if attempts < self.max_attempts:
+                self._update(job_id, status="retrying", error=result.get("error"))
+                # Back in the queue after the delay, to join whatever batch is next
+                self._loop.call_later(self.base_delay * 2 ** (attempts - 1), self._queue.put_nowait, job_id)
+            else:
+                self._update(job_id, status="failed", error=result.get("error"), finished_at=time.time())
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def submit(self, to_email, booking_details, session_id=None):
+        """Queue a confirmation email and return its job id immediately."""
+        self._ensure_worker()
+        job_id = next(self._ids)
+        with self._lock:
+            self._prune(time.time())
+            self._jobs[job_id] = {
+                "to_email": to_email,
+                "booking_details": dict(booking_details),
+                "status": "queued",
+                "attempts": 0,
+                "error": None,
+                "queued_at": time.time(),
+                "finished_at": None,
+            }
+            if session_id is not None:
+                self._latest[session_id] = job_id
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job_id)
+        return job_id
+
+    def _prune(self, now):
+        done = [
+            k for k, job in self._jobs.items()
+            if job["finished_at"] and now - job["finished_at"] > self.retention
+        ]
+        for k in done:
+            del self._jobs[k]
+        for session_id in [s for s, job_id in self._latest.items() if job_id not in self._jobs]:
+            del self._latest[session_id]
+
+    def status(self, job_id):
+        """Return a copy of the job's status dict, or None if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k != "booking_details"}
+
+    def latest_status(self, session_id):
+        """Status of the newest job submitted for a session, or None."""
+        with self._lock:
+            job_id = self._latest.get(session_id)
+        return self.status(job_id) if job_id is not None else None
@@ -1,31 +1,189 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from collections import deque
 import os
+import socket
+import threading
+import time
 from dotenv import load_dotenv
+from utils.tracing import get_tracer
 
 load_dotenv()
 
-def send_confirmation_email(to_email, booking_details):
+# Errors after which a connection can't be trusted and should be replaced.
+# Not OSError: SMTPException subclasses it, and a rejected recipient or
+# message must fail that message rather than trigger a reconnect and resend.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+def starttls_transport(host, port, username, password, timeout=30):
+    """Default transport: SMTP + STARTTLS + login (e.g. Gmail on port 587)."""
+    def connect():
+        server = smtplib.SMTP(host, port, timeout=timeout)
+        server.starttls()
+        server.login(username, password)
+        return server
+    return connect
+
+
+def plain_transport(host, port, timeout=30):
+    """Unauthenticated, unencrypted transport for a local stand-in server (e.g. aiosmtpd)."""
+    def connect():
+        return smtplib.SMTP(host, port, timeout=timeout)
+    return connect
+
+
+class SMTPConnectionPool:
     """
-    Send booking confirmation email using SMTP.
-    Expects env vars: EMAIL_SENDER, EMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT
+    Thread-safe pool of long-lived SMTP connections.
+    `transport` is a zero-argument callable returning a connected, logged-in
+    smtplib.SMTP-like object, so tests can point the pool at a local server.
+    Idle connections are probed with NOOP before reuse and replaced when the
+    server has dropped them.
     """
-    sender_email = os.getenv("EMAIL_SENDER")
-    sender_password = os.getenv("EMAIL_PASSWORD")
-    smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", 587))
 
-    if not sender_email or not sender_password:
-        return {"success": False, "error": "Email credentials not configured"}
+    def __init__(self, transport, size=2, keepalive=60, max_messages=100):
+        self.transport = transport
+        self.size = size
+        self.keepalive = keepalive  # seconds idle before a NOOP probe
+        self.max_messages = max_messages  # recycle after this many sends
+        self._idle = deque()  # (server, last_used, sent_count)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def _open(self):
+        server = self.transport()
+        with self._lock:
+            self.connections_opened += 1
+        return server
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, server):
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    entry = self._idle.popleft() if self._idle else None
+                if entry is None:
+                    return self._open(), 0
+                server, last_used, sent = entry
+                if time.time() - last_used < self.keepalive or self._is_alive(server):
+                    return server, sent
+                self._close(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, server, sent, broken=False):
+        if broken or sent >= self.max_messages:
+            self._close(server)
+        else:
+            with self._lock:
+                self._idle.append((server, time.time(), sent))
+        self._slots.release()
+
+    def send_many(self, messages):
+        """
+        Send several email.message.Message objects over one pooled connection.
+        Reconnects once if the server drops us mid-batch.
+        Returns a list of {"success": bool, "error": str} results in order.
+        """
+        with get_tracer().span("smtp.send", messages=len(messages)) as span:
+            results = self._send_all(messages)
+            span.set("failed", sum(1 for r in results if not r["success"]))
+        return results
+
+    def _send_all(self, messages):
+        results = []
+        server, sent = self._acquire()
+        broken = False
+        try:
+            for msg in messages:
+                try:
+                    server.send_message(msg)
+                except CONNECTION_ERRORS:
+                    # Server dropped us; reconnect once and retry this message
+                    self._close(server)
+                    server, sent = self._open(), 0
+                    try:
+                        server.send_message(msg)
+                    except Exception as e:
+                        results.append({"success": False, "error": str(e)})
+                        continue
+                except Exception as e:
+                    results.append({"success": False, "error": str(e)})
+                    continue
+                sent += 1
+                with self._lock:
+                    self.messages_sent += 1
+                results.append({"success": True})
+        except Exception as e:
+            # Could not reconnect; fail whatever is left
+            broken = True
+            results.extend({"success": False, "error": str(e)} for _ in messages[len(results):])
+        finally:
+            self._release(server, sent, broken=broken)
+        return results
+
+    def send(self, msg):
+        return self.send_many([msg])[0]
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for server, _, _ in idle:
+            self._close(server)
+
 
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_smtp_pool():
+    """Process-wide pool built from EMAIL_* / SMTP_* env vars, or None if not configured."""
+    global _default_pool
+    if _default_pool is None:
+        sender_email = os.getenv("EMAIL_SENDER")
+        sender_password = os.getenv("EMAIL_PASSWORD")
+        if not sender_email or not sender_password:
+            return None
+        with _default_pool_lock:
+            if _default_pool is None:
+                transport = starttls_transport(
+                    os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+                    int(os.getenv("SMTP_PORT", 587)),
+                    sender_email,
+                    sender_password
+                )
+                _default_pool = SMTPConnectionPool(transport, size=int(os.getenv("SMTP_POOL_SIZE", 2)))
+    return _default_pool
+
+
+def build_confirmation_email(sender_email, to_email, booking_details):
     msg = MIMEMultipart()
     msg['From'] = sender_email
     msg['To'] = to_email
     msg['Subject'] = "Lumière Dining - Reservation Confirmed"
 
     first_name = booking_details.get('name', 'Guest').split()[0]
-    
+
     body = f"""
     Dear {first_name},
 
@@ -39,7 +197,7 @@ def send_confirmation_email(to_email, booking_details):
     📝 Requests: {booking_details.get('special_requests') or 'None'}
 
     Address: 123 Gourmet Blvd, Flavor Town.
-    
+
     If you need to modify your booking, please reply to this email.
 
     Warm Regards,
@@ -47,14 +205,31 @@ def send_confirmation_email(to_email, booking_details):
     """
 
     msg.attach(MIMEText(body, 'plain'))
+    return msg
+
 
+def send_confirmation_email(to_email, booking_details, pool=None):
+    """
+    Send booking confirmation email using SMTP.
+    Expects env vars: EMAIL_SENDER, EMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT
+    Uses the shared connection pool unless `pool` is given.
+    """
+    return send_confirmation_emails([(to_email, booking_details)], pool)[0]
+
+
+def send_confirmation_emails(emails, pool=None):
+    """
+    Send several confirmations over one pooled connection (the outbox's batches).
+    `emails` is a list of (to_email, booking_details); returns one result per email.
+    """
+    sender_email = os.getenv("EMAIL_SENDER")
+    pool = pool or get_smtp_pool()
+
+    if not sender_email or pool is None:
+        return [{"success": False, "error": "Email credentials not configured"} for _ in emails]
+
+    messages = [build_confirmation_email(sender_email, to_email, details) for to_email, details in emails]
     try:
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, to_email, text)
-        server.quit()
-        return {"success": True}
+        return pool.send_many(messages)
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return [{"success": False, "error": str(e)} for _ in emails]
@@ -0,0 +1,97 @@
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "pq")
+
+# Faiss warns when k-means gets fewer than this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+
+
+def index_factory_string(index_type, params):
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf":
+        return f"IVF{params['nlist']},Flat"
+    if index_type == "hnsw":
+        return f"HNSW{params['hnsw_m']}"
+    if index_type == "pq":
+        return f"PQ{params['pq_m']}x{params['pq_nbits']}"
+    raise ValueError(f"Unknown FAISS index type: {index_type} (expected one of {', '.join(INDEX_TYPES)})")
+
+
+def min_training_size(index_type, params):
+    """Vectors needed before a trained index type is worth building."""
+    if index_type == "ivf":
+        return params["nlist"] * MIN_POINTS_PER_CENTROID
+    if index_type == "pq":
+        return (2 ** params["pq_nbits"]) * MIN_POINTS_PER_CENTROID
+    return 0
+
+
+def index_type_of(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    return "flat"
+
+
+def supports_compacting_removal(index):
+    """
+    True when remove_ids renumbers the remaining vectors 0..n-1, which is what
+    LangChain's FAISS.delete assumes. IVF keeps the original ids and HNSW
+    can't remove at all, so those are rebuilt instead.
+    """
+    return index_type_of(index) in ("flat", "pq")
+
+
+def set_search_params(index, params):
+    kind = index_type_of(index)
+    if kind == "ivf":
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    elif kind == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = params["hnsw_ef_search"]
+
+
+def build_index(index_type, vectors, params):
+    """Create, train and fill an index of the given type from an (n, d) array."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = vectors.shape[1]
+    index = faiss.index_factory(dim, index_factory_string(index_type, params))
+    if index_type == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = params["hnsw_ef_construction"]
+    if not index.is_trained:
+        index.train(vectors)
+    if len(vectors):
+        index.add(vectors)
+    set_search_params(index, params)
+    return index
+
+
+def reconstruct_all(index):
+    """Return every stored vector as an (ntotal, d) float32 array (approximate for PQ)."""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    if index_type_of(index) == "ivf":
+        faiss.extract_index_ivf(index).make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def rebuild_without(index, positions_to_remove, params):
+    """Copy of `index` without the given positions, renumbered 0..n-1."""
+    vectors = reconstruct_all(index)
+    keep = np.ones(index.ntotal, dtype=bool)
+    keep[list(positions_to_remove)] = False
+    rebuilt = faiss.clone_index(index)
+    rebuilt.reset()  # keeps IVF/PQ training
+    if keep.any():
+        rebuilt.add(np.ascontiguousarray(vectors[keep]))
+    set_search_params(rebuilt, params)
+    return rebuilt
+
+
+def index_memory_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,102 @@
+from collections import Counter, defaultdict
+import math
+import re
+import threading
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Small in-process BM25 inverted index, updated incrementally as chunks are
+    added to or removed from the vector store. Catches exact dish names,
+    allergens and prices that dense embeddings tend to blur.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_freqs = {}  # doc id -> Counter of terms
+        self._lengths = {}  # doc id -> token count
+        self._postings = defaultdict(set)  # term -> doc ids
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._term_freqs)
+
+    def add(self, doc_id, text):
+        if doc_id in self._term_freqs:
+            self.remove(doc_id)
+        tf = Counter(tokenize(text))
+        self._term_freqs[doc_id] = tf
+        self._lengths[doc_id] = sum(tf.values())
+        self._total_length += self._lengths[doc_id]
+        for term in tf:
+            self._postings[term].add(doc_id)
+
+    def remove(self, doc_id):
+        tf = self._term_freqs.pop(doc_id, None)
+        if tf is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in tf:
+            ids = self._postings[term]
+            ids.discard(doc_id)
+            if not ids:
+                del self._postings[term]
+
+    def search(self, query, k=10):
+        """Return [(doc_id, score)] for the top k documents."""
+        n = len(self._term_freqs)
+        if not n:
+            return []
+        avg_length = self._total_length / n
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            ids = self._postings.get(term)
+            if not ids:
+                continue
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for doc_id in ids:
+                freq = self._term_freqs[doc_id][term]
+                length = self._lengths[doc_id]
+                scores[doc_id] += idf * freq * (self.k1 + 1) / (
+                    freq + self.k1 * (1 - self.b + self.b * length / avg_length)
+                )
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merge several ranked lists of ids: score(id) = sum(1 / (k + rank)).
+    Returns ids ordered by fused score.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class CrossEncoderReranker:
+    """Optional sentence-transformers cross-encoder, loaded on first use."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def rerank(self, query, docs):
+        """Reorder (doc_id, text) pairs by cross-encoder relevance."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name)
+        scores = self._model.predict([(query, text) for _, text in docs])
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [docs[i] for i in order]
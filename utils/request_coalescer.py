@@ -0,0 +1,74 @@
+from collections import defaultdict, deque
+from concurrent.futures import Future
+import threading
+import time
+
+
+class RequestCoalescer:
+    """
+    Single-flight for reads: while a call for a key is in progress, identical
+    calls from other threads wait for its result instead of issuing their own
+    request. Nothing is cached once the call returns.
+    """
+
+    def __init__(self):
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def run(self, key, func):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+class MethodTimings:
+    """Recent call durations per method name, for p50/p95 reporting."""
+
+    def __init__(self, window=500):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._calls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples[name].append(seconds * 1000)
+            self._calls[name] += 1
+
+    def timed(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def stats(self):
+        """{name: {"calls", "p50_ms", "p95_ms", "max_ms"}}"""
+        with self._lock:
+            result = {}
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[name] = {
+                    "calls": self._calls[name],
+                    "p50_ms": ordered[len(ordered) // 2],
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "max_ms": ordered[-1],
+                }
+            return result
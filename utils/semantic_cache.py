@@ -0,0 +1,85 @@
+from collections import OrderedDict
+import itertools
+import threading
+import time
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on query embeddings.
+    A lookup hits when a cached query is at least `threshold` cosine-similar
+    to the new one. Entries expire after `ttl` seconds and the least recently
+    used entry is evicted once `max_entries` is reached.
+
+    `clear()` bumps `generation`; read it before retrieving and pass it to
+    `put()` so an answer built from a knowledge base that changed meanwhile
+    is not cached.
+    """
+
+    def __init__(self, threshold=0.92, ttl=3600, max_entries=512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.generation = 0
+        self._entries = OrderedDict()  # id -> (vector, answer, created_at)
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now):
+        expired = [k for k, (_, _, created) in self._entries.items() if now - created > self.ttl]
+        for k in expired:
+            del self._entries[k]
+
+    def get(self, vector):
+        """Return a cached answer for a similar query, or None."""
+        query_vec = self._normalize(vector)
+        with self._lock:
+            self._expire(time.time())
+            if self._entries:
+                keys = list(self._entries.keys())
+                matrix = np.stack([self._entries[k][0] for k in keys])
+                scores = matrix @ query_vec
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = keys[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][1]
+            self.misses += 1
+            return None
+
+    def put(self, vector, answer, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[next(self._ids)] = (self._normalize(vector), answer, time.time())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry, e.g. when the knowledge base changes."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "invalidations": self.invalidations,
+            }
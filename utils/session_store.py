@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import json
+import sqlite3
+import threading
+import time
+
+
+class MemorySessionStore:
+    """
+    In-process session store: per-session state dicts kept as JSON, dropped
+    after `ttl` seconds without access, least recently used evicted beyond
+    `max_entries`. Sizes are tracked so the Admin page can show memory use.
+    """
+
+    def __init__(self, ttl=1800, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # session_id -> (json, last_access)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id):
+        data, _ = self._entries.pop(session_id)
+        self._bytes -= len(data)
+
+    def _expire(self, now):
+        # Entries are in access order, so stale ones are at the front
+        while self._entries:
+            session_id, (_, last_access) = next(iter(self._entries.items()))
+            if now - last_access <= self.ttl:
+                break
+            self._drop(session_id)
+            self.expirations += 1
+
+    def get(self, session_id):
+        """Return the saved state dict for a session, or None."""
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            self._entries[session_id] = (entry[0], now)
+            self._entries.move_to_end(session_id)
+            return json.loads(entry[0])
+
+    def put(self, session_id, state):
+        data = json.dumps(state)
+        with self._lock:
+            if session_id in self._entries:
+                self._drop(session_id)
+            self._entries[session_id] = (data, time.time())
+            self._bytes += len(data)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, session_id):
+        with self._lock:
+            if session_id in self._entries:
+                self._drop(session_id)
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.time())
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteSessionStore:
+    """
+    Same interface backed by a local SQLite file, so several app processes on
+    one host share in-progress bookings and they survive restarts.
+    """
+
+    def __init__(self, path="sessions.db", ttl=1800, max_entries=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self._conn.commit()
+
+    def _expire(self, now):
+        cur = self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.ttl,))
+        self.expirations += cur.rowcount
+
+    def get(self, session_id):
+        with self._lock:
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT state, last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._expire(now)
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    def put(self, session_id, state):
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, last_access) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state), now),
+            )
+            self._expire(now)
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            if count > self.max_entries:
+                cur = self._conn.execute(
+                    "DELETE FROM sessions WHERE session_id IN "
+                    "(SELECT session_id FROM sessions ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+                self.evictions += cur.rowcount
+            self._conn.commit()
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.time())
+            self._conn.commit()
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM sessions"
+            ).fetchone()
+            return {
+                "backend": "sqlite",
+                "entries": entries,
+                "bytes": size,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def create_session_store(backend="memory", ttl=1800, max_entries=10000, path="sessions.db"):
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, ttl=ttl, max_entries=max_entries)
+    if backend != "memory":
+        print(f"Unknown session backend '{backend}', using memory")
+    return MemorySessionStore(ttl=ttl, max_entries=max_entries)
@@ -0,0 +1,240 @@
+"""
+Lightweight tracing for chat turns.
+
+    with get_tracer().span("rag.query", k=3) as span:
+        ...
+        span.set("context_tokens", 412)
+
+Spans nest through a context variable, so a span opened anywhere below
+`chat.turn` (RAG, LLM, Supabase) becomes its child, including inside
+asyncio.to_thread. Finished traces are exported as OTLP/JSON lines (one
+ExportTraceServiceRequest per trace, readable by the OpenTelemetry
+Collector's otlpjsonfile receiver) and/or printed to the console, and every
+span's duration feeds the per-stage percentiles shown on the Admin page.
+"""
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import contextvars
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config.config import Config
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = {key: value for key, value in (attributes or {}).items() if value is not None}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class ConsoleExporter:
+    """Prints each finished trace as an indented tree."""
+
+    def export(self, spans):
+        children = defaultdict(list)
+        for span in spans:
+            children[span.parent_id].append(span)
+        lines = []
+
+        def walk(parent_id, depth):
+            for span in sorted(children.get(parent_id, []), key=lambda s: s.start_ns):
+                attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+                status = f" ERROR {span.error}" if span.error else ""
+                lines.append(f"  {'  ' * depth}{span.name} {span.duration_ms:.1f} ms {attrs}{status}".rstrip())
+                walk(span.span_id, depth + 1)
+
+        walk(None, 0)
+        print(f"Trace {spans[-1].trace_id[:8]}:\n" + "\n".join(lines))
+
+
+class JsonlExporter:
+    """Appends one OTLP/JSON ExportTraceServiceRequest per trace to a file."""
+
+    def __init__(self, path, service_name="restaurant-assistant"):
+        self.path = path
+        self.resource = {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]}
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        line = json.dumps({
+            "resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{"scope": {"name": "utils.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        })
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class Tracer:
+    """
+    Creates spans, keeps recent durations per span name for percentiles,
+    and hands each finished trace to the exporters.
+    """
+
+    def __init__(self, exporters=(), window=1000, max_pending=1000):
+        self.exporters = list(exporters)
+        self.max_pending = max_pending
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._cache = defaultdict(lambda: [0, 0])  # name -> [hits, lookups]
+        self._tokens = defaultdict(int)  # (name, attribute) -> total
+        self._pending = {}  # trace id -> finished spans waiting for their root
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # A generator closed from another context (abandoned stream)
+                pass
+            self._finish(span)
+
+    def _finish(self, span):
+        span.end_ns = time.time_ns()
+        with self._lock:
+            self._durations[span.name].append(span.duration_ms)
+            self._counts[span.name] += 1
+            if span.error:
+                self._errors[span.name] += 1
+            if "cache_hit" in span.attributes:
+                stats = self._cache[span.name]
+                stats[0] += bool(span.attributes["cache_hit"])
+                stats[1] += 1
+            for key, value in span.attributes.items():
+                if key.endswith("_tokens") and isinstance(value, int):
+                    self._tokens[(span.name, key)] += value
+            if not self.exporters:
+                return
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if span.parent_id is not None:
+                if len(self._pending) > self.max_pending:
+                    # Roots that never finished; drop the oldest
+                    self._pending.pop(next(iter(self._pending)))
+                return
+            del self._pending[span.trace_id]
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                print(f"Trace export failed ({type(exporter).__name__}): {e}")
+
+    def stage_stats(self):
+        """{span name: {"count", "errors", "p50_ms", "p95_ms", "p99_ms", "max_ms", "cache_hit_rate", <token totals>}}"""
+        with self._lock:
+            result = {}
+            for name, samples in self._durations.items():
+                ordered = sorted(samples)
+                stats = {
+                    "count": self._counts[name],
+                    "errors": self._errors[name],
+                    "p50_ms": ordered[len(ordered) // 2],
+                    "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                    "max_ms": ordered[-1],
+                }
+                if name in self._cache:
+                    hits, lookups = self._cache[name]
+                    stats["cache_hit_rate"] = hits / lookups
+                result[name] = stats
+            for (name, key), total in self._tokens.items():
+                result[name][key] = total
+            return result
+
+    def reset(self):
+        with self._lock:
+            for store in (self._durations, self._counts, self._errors, self._cache, self._tokens):
+                store.clear()
+
+
+def annotate(**attributes):
+    """Set attributes on the innermost open span, if there is one."""
+    span = _current_span.get()
+    if span is not None:
+        for key, value in attributes.items():
+            span.set(key, value)
+
+
+def create_exporters(spec, path):
+    """"console", "jsonl" or both (comma-separated); anything else exports nothing."""
+    exporters = []
+    for name in (part.strip().lower() for part in spec.split(",")):
+        if name == "console":
+            exporters.append(ConsoleExporter())
+        elif name == "jsonl":
+            exporters.append(JsonlExporter(path))
+    return exporters
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer configured from Config.TRACE_EXPORTER / TRACE_FILE."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer(create_exporters(Config.TRACE_EXPORTER, Config.TRACE_FILE), window=Config.TRACE_WINDOW)
+    return _tracer